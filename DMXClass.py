@@ -1,53 +1,305 @@
 import time
-import serial
 import threading
+from dmx_backends import SerialBackend, wait_until_ns
 
 class SimpleDMX:
-    def __init__(self):
-        self.ser = serial.Serial(
-            port='COM3',
-            baudrate=250000,
-            bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
-            stopbits=serial.STOPBITS_TWO,
-            timeout=1
-        )
+    def __init__(self, frame_rate=40, backend=None, change_driven=False, keep_alive_rate=5):
+        """
+        Args:
+            frame_rate (float): Frames per second. In change-driven mode this is the
+                most frames per second that will be sent.
+            backend: Output backend (see dmx_backends.py), COM3 serial by default
+            change_driven (bool): Only send a frame when its contents changed, right
+                away instead of on the next frame slot. Unchanged frames are repeated
+                at keep_alive_rate so the fixture keeps seeing a signal.
+            keep_alive_rate (float): Frames per second sent while nothing changes
+        """
+        # Where frames go - the COM3 serial adapter unless another backend is given
+        self.backend = backend if backend is not None else SerialBackend('COM3')
+        
         # DMX universe: start code + 512 channels
-        self.dmx_data = bytearray(34)
-        self.dmx_data[0] = 0  # Start code
+        # Patterns write into the staging buffer; commit() publishes it as an immutable
+        # frame that the transmit thread picks up by reference, so it never sends a
+        # half-written frame and never copies on its side.
+        # Writes outside begin_frame()/commit() are not published one by one: the
+        # transmit thread publishes them once per frame it sends.
+        self._staging = bytearray(34)
+        self._staging[0] = 0  # Start code
+        self.dmx_data = bytes(self._staging)  # Last committed frame
+        self._in_frame = False
+        self._dirty = False  # Staging has writes that have not been published yet
+        self._publish_lock = threading.Lock()
+        self._frame_ready = threading.Event()  # Set on new frames and loose writes
+        
+        # Bulk writes go straight into the staging buffer through a memoryview slice
+        self._view = memoryview(self._staging)
+        self._zeros = bytes(len(self._staging) - 1)
+        
+        # Transmit timing and running statistics (see get_stats)
+        self.set_frame_rate(frame_rate)
+        self.change_driven = change_driven
+        self.keep_alive_ns = int(1e9 / keep_alive_rate)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
         
         # Threading for continuous transmission
         self.running = True
-        self.transmit_thread = threading.Thread(target=self._continuous_transmit)
+        transmit = self._change_driven_transmit if change_driven else self._continuous_transmit
+        self.transmit_thread = threading.Thread(target=transmit)
         self.transmit_thread.daemon = True
         self.transmit_thread.start()
         
     def _continuous_transmit(self):
-        """Continuously send DMX data at ~40fps (closer to standard)"""
+        """
+        Continuously send DMX data at frame_rate (40fps by default, closer to standard).
+        Frames start on fixed perf_counter_ns deadlines, so write/flush time does not
+        stretch the period. A frame that ends past its deadline counts as an overrun
+        and the schedule restarts from now instead of bursting to catch up.
+        """
+        next_deadline = time.perf_counter_ns()
+        last_start = None
+        
         while self.running:
-            self._send_dmx()
-            time.sleep(1/40)  # ~40fps transmission rate
+            self._publish_loose_writes()
+            start = time.perf_counter_ns()
+            self._send_dmx(self.dmx_data)
+            end = time.perf_counter_ns()
+            
+            next_deadline += self.period_ns
+            overrun = end > next_deadline
+            if overrun:
+                next_deadline = end
+            
+            self._record_frame(None if last_start is None else start - last_start, end - start, overrun)
+            last_start = start
+            wait_until_ns(next_deadline)
     
-    def _send_dmx(self):
-        """Send DMX data with proper timing"""
-        # Send break (longer for better compatibility)
-        self.ser.break_condition = True
-        time.sleep(0.000176)  # 176 microseconds break
-        self.ser.break_condition = False
-        time.sleep(0.000012)  # 12 microseconds mark after break
+    def _change_driven_transmit(self):
+        """
+        Send a frame as soon as commit() publishes a changed one, at most frame_rate
+        times per second. While nothing changes the last frame is only repeated every
+        keep_alive_ns. commit() publishes a new bytes object only for changed contents,
+        so "changed" is a cheap identity check here.
+        """
+        last_sent = None
+        last_start = None
         
-        # Send data
-        self.ser.write(self.dmx_data)
-        self.ser.flush()
+        while self.running:
+            self._frame_ready.clear()
+            self._publish_loose_writes()
+            frame = self.dmx_data
+            now = time.perf_counter_ns()
+            
+            keep_alive = frame is last_sent
+            if keep_alive and now - last_start < self.keep_alive_ns:
+                # Nothing new - sleep until the keep-alive is due or a frame is committed
+                self._frame_ready.wait((last_start + self.keep_alive_ns - now) / 1e9)
+                continue
+            
+            # Never send faster than frame_rate; pick up anything committed meanwhile
+            if last_start is not None and now - last_start < self.period_ns:
+                wait_until_ns(last_start + self.period_ns)
+                self._publish_loose_writes()
+                frame = self.dmx_data
+                keep_alive = frame is last_sent
+            
+            start = time.perf_counter_ns()
+            self._send_dmx(frame)
+            end = time.perf_counter_ns()
+            
+            self._record_frame(None if last_start is None else start - last_start, end - start,
+                               False, keep_alive)
+            last_sent = frame
+            last_start = start
+    
+    def _record_frame(self, period_ns, send_ns, overrun, keep_alive=False):
+        """Update running period/jitter statistics (Welford's algorithm)"""
+        with self._stats_lock:
+            stats = self._stats
+            stats['frames'] += 1
+            stats['overruns'] += overrun
+            stats['keep_alives'] += keep_alive
+            stats['max_send_ns'] = max(stats['max_send_ns'], send_ns)
+            if period_ns is None:
+                return
+            
+            stats['periods'] += 1
+            delta = period_ns - stats['mean_period_ns']
+            stats['mean_period_ns'] += delta / stats['periods']
+            stats['m2'] += delta * (period_ns - stats['mean_period_ns'])
+            stats['min_period_ns'] = min(stats['min_period_ns'], period_ns)
+            stats['max_period_ns'] = max(stats['max_period_ns'], period_ns)
+    
+    def set_frame_rate(self, frame_rate):
+        """Change the transmit rate in frames per second (takes effect next frame)"""
+        self.frame_rate = frame_rate
+        self.period_ns = int(1e9 / frame_rate)
+    
+    def reset_stats(self):
+        """Start collecting transmit statistics from scratch"""
+        with self._stats_lock:
+            self._stats = {
+                'frames': 0,
+                'periods': 0,
+                'overruns': 0,
+                'keep_alives': 0,
+                'mean_period_ns': 0.0,
+                'm2': 0.0,
+                'min_period_ns': float('inf'),
+                'max_period_ns': 0,
+                'max_send_ns': 0,
+            }
+    
+    def get_stats(self):
+        """
+        Snapshot of transmit timing since start (or the last reset_stats()).
+        
+        In continuous mode frames go out on a fixed period, so the numbers describe how
+        well that period was kept: achieved frame rate, mean/min/max period and jitter
+        (standard deviation of the period). In change-driven mode the gaps between frames
+        follow the music, so there is no period to keep; instead the frames are split
+        into changes and keep-alives and the gaps are reported as they are.
+        
+        Returns:
+            dict: mode, frames sent, overruns (frames that missed their deadline), slowest
+                send and the mode's timing figures, all times in milliseconds
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        
+        periods = stats['periods']
+        mean_ms = stats['mean_period_ns'] / 1e6
+        min_ms = stats['min_period_ns'] / 1e6 if periods else 0.0
+        max_ms = stats['max_period_ns'] / 1e6
+        result = {
+            'mode': 'change-driven' if self.change_driven else 'continuous',
+            'frames': stats['frames'],
+            'overruns': stats['overruns'],
+            'max_send_ms': stats['max_send_ns'] / 1e6,
+        }
+        if self.change_driven:
+            result.update({
+                'changes': stats['frames'] - stats['keep_alives'],  # Sent because the frame changed
+                'keep_alives': stats['keep_alives'],  # Unchanged frames resent at keep_alive_rate
+                'max_fps': self.frame_rate,
+                'mean_gap_ms': mean_ms,
+                'min_gap_ms': min_ms,
+                'max_gap_ms': max_ms,
+            })
+        else:
+            result.update({
+                'target_fps': self.frame_rate,
+                'achieved_fps': 1000 / mean_ms if periods else 0.0,
+                'mean_period_ms': mean_ms,
+                'min_period_ms': min_ms,
+                'max_period_ms': max_ms,
+                'jitter_ms': (stats['m2'] / periods) ** 0.5 / 1e6 if periods else 0.0,
+            })
+        return result
+    
+    def _send_dmx(self, frame):
+        """Hand a committed frame to the output backend"""
+        self.backend.send(frame)
+    
+    def begin_frame(self):
+        """Start a frame: set_channel calls are staged until commit()"""
+        with self._publish_lock:
+            self._in_frame = True
+    
+    def commit(self):
+        """
+        Publish the staged channels as one frame and end the current frame.
+        Nothing is published when the staged frame equals the last one.
+        """
+        with self._publish_lock:
+            self._in_frame = False
+            self._publish()
+    
+    def _publish(self):
+        """Snapshot the staging buffer as the next frame (caller holds _publish_lock)"""
+        if not self._dirty:
+            return
+        
+        self._dirty = False
+        frame = bytes(self._staging)
+        if frame != self.dmx_data:
+            self.dmx_data = frame
+            self._frame_ready.set()
+    
+    def _publish_loose_writes(self):
+        """Transmit thread: publish writes made outside begin_frame()/commit()"""
+        if self._dirty and not self._in_frame:
+            with self._publish_lock:
+                if not self._in_frame:
+                    self._publish()
+    
+    def _loose_write(self):
+        """A write outside a frame: wake a change-driven transmit thread to publish it"""
+        if not self._in_frame:
+            self._frame_ready.set()
     
     def set_channel(self, channel, value):
-        """Set channel (1-34) to value (0-255)"""
-        if 1 <= channel <= 34:
-            self.dmx_data[channel] = max(0, min(255, value))
-            # No need to send_dmx() here - continuous thread handles it
+        """Set channel (1-33) to value (0-255)"""
+        if 1 <= channel < len(self._staging):
+            value = max(0, min(255, value))
+            if self._staging[channel] == value:
+                return
+            self._staging[channel] = value
+            self._dirty = True
+            # No need to send_dmx() here - the transmit thread publishes and sends it
+            self._loose_write()
+    
+    def set_channels(self, start, values):
+        """
+        Set consecutive channels starting at start (1-33) with one slice assignment.
+        values can be a NumPy uint8 array, bytes/bytearray or any other uint8 buffer,
+        which are written as is. Plain sequences of ints are clamped to 0-255 first.
+        Channels past the end of the universe are ignored.
+        """
+        data = self._as_bytes(values)
+        if start < 1:
+            data = data[1 - start:]
+            start = 1
+        end = min(start + len(data), len(self._staging))
+        if start >= end:
+            return
+        
+        data = data[:end - start]
+        if self._view[start:end] == data:
+            return
+        self._view[start:end] = data
+        self._dirty = True
+        self._loose_write()
+    
+    def set_frame(self, values):
+        """Set every channel from 1 upwards from one uint8 array/buffer"""
+        self.set_channels(1, values)
+    
+    def clear(self):
+        """Set channels 1-33 to 0 in one write (start code is left alone)"""
+        if self._view[1:] == self._zeros:
+            return
+        self._view[1:] = self._zeros
+        self._dirty = True
+        self._loose_write()
+    
+    @staticmethod
+    def _as_bytes(values):
+        """Return values as a flat uint8 memoryview/bytes without copying buffers"""
+        try:
+            view = memoryview(values)
+        except TypeError:
+            return bytes(max(0, min(255, int(v))) for v in values)
+        
+        if view.itemsize != 1:
+            raise TypeError(f"Expected uint8 channel data, got format '{view.format}'")
+        if not view.c_contiguous:
+            return view.tobytes()
+        return view.cast('B')
     
     def close(self):
         """Close connection"""
         self.running = False
+        self._frame_ready.set()  # Wake a change-driven transmit thread
         self.transmit_thread.join()
-        self.ser.close()
\ No newline at end of file
+        self.backend.close()
\ No newline at end of file
@@ -0,0 +1,79 @@
+# === Audio Clock ===
+# Plays the song through a sounddevice output stream and uses the stream's own clock
+# as the time source for the light show, so the lights follow what is actually
+# coming out of the speakers instead of a separately running sleep loop.
+
+import threading
+import time
+from labeling.app.stream_clock import dac_time, anchored_position
+
+# Longest single sleep while waiting for a song time (one DMX frame)
+MAX_WAIT = 1 / 40
+
+class AudioClockPlayer:
+    def __init__(self, y, sr, blocksize=512):
+        """
+        Args:
+            y (np.ndarray): Mono float32 audio
+            sr (int): Sample rate
+            blocksize (int): Samples per audio callback
+        """
+        import sounddevice as sd  # Only needed when playing audio
+
+        self._sd = sd
+        self.y = y
+        self.sr = sr
+        self.cursor = 0  # Next sample the callback will write
+        self._anchor = None  # (first sample of the last buffer, DAC time it plays at)
+        self.finished = threading.Event()
+
+        self.stream = sd.OutputStream(samplerate=sr, channels=1, dtype='float32',
+                                      blocksize=blocksize, callback=self._callback,
+                                      finished_callback=self.finished.set)
+
+    def _callback(self, outdata, frames, time_info, status):
+        """Audio thread: copy the next block of the song and remember when it will be heard"""
+        chunk = self.y[self.cursor:self.cursor + frames]
+        outdata[:len(chunk), 0] = chunk
+        outdata[len(chunk):] = 0
+
+        self._anchor = (self.cursor, dac_time(self.stream, time_info))
+        self.cursor += frames
+
+        if len(chunk) < frames:
+            raise self._sd.CallbackStop
+
+    def start(self):
+        self.stream.start()
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+
+    @property
+    def duration(self):
+        return len(self.y) / self.sr
+
+    def position(self):
+        """
+        Song position in seconds of the sample playing right now, from the stream clock.
+        Negative until the first buffer reaches the speakers.
+        """
+        anchor = self._anchor
+        if anchor is None:
+            return -self.stream.latency
+        return anchored_position(self.stream, self.sr, anchor)
+
+def wait_for_song_time(clock, target, finished=None):
+    """
+    Sleep until clock() (song position in seconds) reaches target.
+    Returns early once the optional finished event is set, e.g. AudioClockPlayer.finished,
+    since the stream clock may stop when the stream does.
+    """
+    while True:
+        if finished is not None and finished.is_set():
+            return
+        remaining = target - clock()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, MAX_WAIT))
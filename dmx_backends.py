@@ -0,0 +1,105 @@
+# === DMX Output Backends ===
+# SimpleDMX builds frames and keeps time; a backend puts each finished frame somewhere.
+# SerialBackend drives the real FTDI USB-DMX adapter on COM3, LoopbackBackend and
+# NullBackend let the whole pipeline run (and be benchmarked) with no hardware attached.
+
+import time
+from collections import deque
+
+# Sleep until this close to a deadline, then busy-wait the rest
+# (time.sleep has millisecond granularity on many kernels)
+SPIN_NS = 1_000_000
+
+def wait_until_ns(deadline_ns):
+    """Block until time.perf_counter_ns() reaches deadline_ns"""
+    remaining = deadline_ns - time.perf_counter_ns()
+    if remaining > SPIN_NS:
+        time.sleep((remaining - SPIN_NS) / 1e9)
+    while time.perf_counter_ns() < deadline_ns:
+        pass
+
+class DMXBackend:
+    """Output interface used by SimpleDMX's transmit thread"""
+
+    def send(self, frame):
+        """Output one frame (bytes: start code followed by the channel values)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release whatever the backend holds open"""
+        pass
+
+class SerialBackend(DMXBackend):
+    """Sends frames over a serial DMX adapter with break / mark-after-break timing"""
+
+    def __init__(self, port='COM3'):
+        import serial  # Only needed when driving real hardware
+
+        self.ser = serial.Serial(
+            port=port,
+            baudrate=250000,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_TWO,
+            timeout=1
+        )
+
+    def send(self, frame):
+        """Send DMX data with proper timing"""
+        # Send break (longer for better compatibility)
+        self.ser.break_condition = True
+        wait_until_ns(time.perf_counter_ns() + 176_000)  # 176 microseconds break
+        self.ser.break_condition = False
+        wait_until_ns(time.perf_counter_ns() + 12_000)  # 12 microseconds mark after break
+
+        # Send data
+        self.ser.write(frame)
+        self.ser.flush()
+
+    def close(self):
+        self.ser.close()
+
+class LoopbackBackend(DMXBackend):
+    """
+    Records every frame with its perf_counter_ns timestamp in a ring buffer.
+    Frames are the immutable bytes objects SimpleDMX commits, so recording costs
+    no copy. Once the buffer is full the oldest frames are dropped.
+    """
+
+    def __init__(self, capacity=4096):
+        self.frames = deque(maxlen=capacity)  # (timestamp_ns, frame) pairs
+        self.frame_count = 0  # Total frames sent, including ones dropped from the ring
+
+    def send(self, frame):
+        self.frames.append((time.perf_counter_ns(), frame))
+        self.frame_count += 1
+
+    def last_frame(self):
+        """Most recent frame, or None if nothing was sent yet"""
+        return self.frames[-1][1] if self.frames else None
+
+    def snapshot(self):
+        """List of the (timestamp_ns, frame) pairs currently in the ring"""
+        return list(self.frames)
+
+class NullBackend(DMXBackend):
+    """Discards every frame"""
+
+    def send(self, frame):
+        pass
+
+def open_backend(name='serial', port='COM3'):
+    """
+    Create a backend by name.
+
+    Args:
+        name (str): "serial", "loopback" or "null"
+        port (str): Serial port for the serial backend
+    """
+    if name == 'serial':
+        return SerialBackend(port)
+    if name == 'loopback':
+        return LoopbackBackend()
+    if name == 'null':
+        return NullBackend()
+    raise ValueError(f"Unknown DMX backend: {name}")
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import numpy as np
+from pathlib import Path
+import librosa
+
+class AudioCache:
+    """
+    On-disk cache of decoded audio, so a song is only decoded and resampled once.
+
+    Entries are float32 .npy files keyed by a hash of the audio file's contents and the
+    sample rate, opened memory-mapped on a hit. index.json remembers the content hash
+    for each (path, size, mtime) so unchanged files are not re-hashed on every open.
+    The cache is kept under max_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=2 * 1024 ** 3):
+        # Next to this file by default (labeling/app/cache), wherever the app is launched from
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else Path(__file__).parent / "cache"
+        self.cache_dir.mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / "index.json"
+        self.index = self._read_index()
+
+    def load(self, file_path, sr=22050):
+        """
+        Decoded mono audio for file_path at sample rate sr, like librosa.load(file_path, sr=sr).
+
+        Returns:
+            tuple: (y, sr), y is a read-only memory-mapped float32 array
+        """
+        key = self.cache_key(file_path, sr)
+        y = self.get(key)
+        if y is not None:
+            return y, sr
+
+        y, sr = librosa.load(file_path, sr=sr)
+        return self.store(key, y), sr
+
+    def get(self, key):
+        """Cached audio for key memory-mapped, or None on a miss"""
+        entry = self.entry_path(key)
+        if not entry.exists():
+            return None
+        os.utime(entry)  # Mark as recently used
+        return np.load(entry, mmap_mode='r')
+
+    def store(self, key, y):
+        """Write decoded audio for key and return it memory-mapped"""
+        entry = self.entry_path(key)
+        tmp_path = entry.with_name(entry.stem + ".tmp.npy")
+        np.save(tmp_path, np.asarray(y, dtype=np.float32))
+        os.replace(tmp_path, entry)
+
+        self.evict(keep=key)
+        return np.load(entry, mmap_mode='r')
+
+    def cache_key(self, file_path, sr):
+        """Content hash of the file plus the sample rate"""
+        return f"{self.content_hash(file_path)}_{sr}"
+
+    def entry_path(self, key, suffix=".npy"):
+        """Cache file for a key; other data cached per song uses its own suffix"""
+        return self.cache_dir / f"{key}{suffix}"
+
+    def content_hash(self, file_path):
+        """BLAKE2 hash of the file contents, reused while the file's size and mtime are unchanged"""
+        stat = os.stat(file_path)
+        index_key = f"{Path(file_path).resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        if index_key in self.index:
+            return self.index[index_key]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+        self.index[index_key] = digest.hexdigest()
+        self._write_index()
+        return self.index[index_key]
+
+    def evict(self, keep=None):
+        """Delete least recently used entries (and their side files) until under max_bytes"""
+        entries = {}
+        for path in self.cache_dir.iterdir():
+            if path == self.index_path or ".tmp" in path.name:
+                continue
+            key = path.name.split(".", 1)[0]
+            if key != keep:
+                entries.setdefault(key, []).append(path)
+
+        def last_used(key):
+            main = self.entry_path(key)
+            return main.stat().st_mtime if main.exists() else 0
+
+        total = sum(path.stat().st_size for path in self.cache_dir.iterdir() if path != self.index_path)
+        for key in sorted(entries, key=last_used):
+            if total <= self.max_bytes:
+                break
+            for path in entries[key]:
+                size = path.stat().st_size
+                try:
+                    path.unlink()
+                except OSError:
+                    continue  # Still memory-mapped somewhere (Windows), try again next time
+                total -= size
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,151 @@
+import queue
+import threading
+import numpy as np
+import soundfile as sf
+import soxr
+import librosa
+from waveform import WaveformPyramid
+
+class AudioLoader(threading.Thread):
+    """
+    Decodes a song on a worker thread so the Tk thread never blocks on it.
+
+    Progress is posted to self.messages as (kind, ...) tuples for the UI to poll with
+    root.after, in this order:
+        ("info", duration, sr)           Known before decoding, labeling can start
+        ("envelope", start, mins, maxs)  Waveform min/max for display bins start:start+len
+        ("progress", fraction)           Share of the song decoded so far
+        ("done", y, pyramid)             Full decoded audio (memory-mapped from the cache)
+                                         and its WaveformPyramid
+        ("error", message)
+    A coarse envelope for the whole song is sent first from a few samples per bin;
+    the exact envelope then follows the decoder from the start of the song.
+    """
+
+    def __init__(self, cache, file_path, sr=22050, n_bins=2000, block_seconds=5):
+        super().__init__(daemon=True)
+        self.cache = cache
+        self.file_path = file_path
+        self.sr = sr
+        self.n_bins = n_bins
+        self.block_seconds = block_seconds
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop decoding after the current block, nothing more is posted"""
+        self.cancelled.set()
+
+    def post(self, *message):
+        if not self.cancelled.is_set():
+            self.messages.put(message)
+
+    def run(self):
+        try:
+            key = self.cache.cache_key(self.file_path, self.sr)
+            y = self.cache.get(key)
+            if y is None:
+                y = self.decode(key)
+            else:
+                check_not_empty(len(y), self.file_path)
+                self.post("info", len(y) / self.sr, self.sr)
+                self.post("envelope", 0, *waveform_envelope(y, bin_edges(len(y), self.n_bins)))
+            if y is not None:
+                self.post("done", y, self.pyramid(key, y))
+        except Exception as e:
+            self.post("error", str(e))
+
+    def decode(self, key):
+        """Decode block by block into a preallocated buffer, then store it in the cache"""
+        try:
+            f = sf.SoundFile(self.file_path)
+        except RuntimeError:
+            # Formats libsndfile can't read (m4a, aac): decode in one go, still off the Tk thread
+            duration = librosa.get_duration(path=self.file_path)
+            check_not_empty(int(duration * self.sr), self.file_path)
+            self.post("info", duration, self.sr)
+            y, _ = librosa.load(self.file_path, sr=self.sr)
+            self.post("envelope", 0, *waveform_envelope(y, bin_edges(len(y), self.n_bins)))
+            return self.cache.store(key, y)
+
+        with f:
+            n_samples = int(np.ceil(f.frames * self.sr / f.samplerate))
+            check_not_empty(n_samples, self.file_path)
+            self.post("info", n_samples / self.sr, self.sr)
+
+            edges = bin_edges(n_samples, self.n_bins)
+            self.post("envelope", 0, *self.coarse_envelope(f, edges * f.samplerate // self.sr))
+
+            y = np.zeros(n_samples, dtype=np.float32)
+            resampler = soxr.ResampleStream(f.samplerate, self.sr, 1, dtype='float32', quality='HQ')
+            written = 0
+            done_bins = 0
+            block_frames = int(self.block_seconds * f.samplerate)
+            f.seek(0)
+
+            while True:
+                if self.cancelled.is_set():
+                    return None
+                block = f.read(block_frames, dtype='float32', always_2d=True)
+                last = len(block) < block_frames
+                # Mono mix the same way librosa.load does
+                out = resampler.resample_chunk(block.mean(axis=1), last=last)
+
+                out = out[:n_samples - written]
+                y[written:written + len(out)] = out
+                written += len(out)
+
+                # Exact envelope for the display bins that are now fully decoded
+                complete = np.searchsorted(edges, written, side='right') - 1
+                if complete > done_bins:
+                    mins, maxs = waveform_envelope(y, edges[done_bins:complete + 1])
+                    self.post("envelope", done_bins, mins, maxs)
+                    done_bins = complete
+                self.post("progress", written / n_samples)
+
+                if last:
+                    break
+
+        return self.cache.store(key, y[:written])
+
+    def pyramid(self, key, y):
+        """WaveformPyramid for the song, kept in the cache next to the audio"""
+        path = self.cache.entry_path(key, ".envelope.npz")
+        if path.exists():
+            return WaveformPyramid.load(path)
+        pyramid = WaveformPyramid.build(y, self.sr)
+        pyramid.save(path)
+        return pyramid
+
+    def coarse_envelope(self, f, edges):
+        """Min/max of a short read at the start of every bin, in source frames"""
+        mins = np.zeros(len(edges) - 1, dtype=np.float32)
+        maxs = np.zeros(len(edges) - 1, dtype=np.float32)
+        probe = max(1, min(1024, int(edges[1] - edges[0])))
+        for i, start in enumerate(edges[:-1]):
+            if self.cancelled.is_set():
+                break
+            f.seek(int(start))
+            block = f.read(probe, dtype='float32', always_2d=True).mean(axis=1)
+            if len(block):
+                mins[i] = block.min()
+                maxs[i] = block.max()
+        return mins, maxs
+
+def check_not_empty(n_samples, file_path):
+    """Reject audio without samples (empty or truncated files), there is nothing to label"""
+    if n_samples == 0:
+        raise ValueError(f"{file_path} contains no audio")
+
+def bin_edges(n_samples, n_bins):
+    """Sample index where each display bin starts, plus n_samples at the end"""
+    return np.linspace(0, n_samples, min(n_bins, max(1, n_samples)) + 1).astype(np.int64)
+
+def waveform_envelope(y, edges):
+    """Min and max of y between consecutive edges"""
+    start, end = int(edges[0]), int(edges[-1])
+    if end <= start:
+        return np.zeros(0, dtype=y.dtype), np.zeros(0, dtype=y.dtype)
+    segment = y[start:end]
+    offsets = edges[:-1] - start
+    return np.minimum.reduceat(segment, offsets), np.maximum.reduceat(segment, offsets)
@@ -0,0 +1,87 @@
+from bisect import bisect_left, bisect_right, insort
+
+class DividerIndex:
+    """
+    Plateau dividers as a sorted list of label indices. Lookups are binary searches,
+    so selecting a divider or finding the dividers around a position stays O(log n)
+    however many dividers a long mix has.
+    """
+
+    def __init__(self, indices=()):
+        self.indices = sorted(set(indices))
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        return iter(self.indices)
+
+    def __contains__(self, label_idx):
+        i = bisect_left(self.indices, label_idx)
+        return i < len(self.indices) and self.indices[i] == label_idx
+
+    def add(self, label_idx):
+        """Insert a divider, returns False if there already is one at label_idx"""
+        if label_idx in self:
+            return False
+        insort(self.indices, label_idx)
+        return True
+
+    def remove(self, label_idx):
+        i = bisect_left(self.indices, label_idx)
+        if i < len(self.indices) and self.indices[i] == label_idx:
+            del self.indices[i]
+
+    def move(self, label_idx, new_idx):
+        """Move a divider, returns where it ended up (it stays put if new_idx is taken)"""
+        if new_idx == label_idx or new_idx in self:
+            return label_idx
+        self.remove(label_idx)
+        insort(self.indices, new_idx)
+        return new_idx
+
+    def clear(self):
+        self.indices.clear()
+
+    def rank(self, label_idx):
+        """Position of a divider in sorted order"""
+        return bisect_left(self.indices, label_idx)
+
+    def previous(self, label_idx):
+        """Last divider at or before label_idx, or None"""
+        i = bisect_right(self.indices, label_idx)
+        return self.indices[i - 1] if i else None
+
+    def next(self, label_idx):
+        """First divider after label_idx, or None"""
+        i = bisect_right(self.indices, label_idx)
+        return self.indices[i] if i < len(self.indices) else None
+
+    def nearest(self, position, max_distance=float('inf')):
+        """Divider closest to position (a label index, may be fractional) within max_distance, or None"""
+        i = bisect_left(self.indices, position)
+        candidates = self.indices[max(0, i - 1):i + 1]
+        if not candidates:
+            return None
+        closest = min(candidates, key=lambda d: abs(d - position))
+        return closest if abs(closest - position) < max_distance else None
+
+    def bounds(self, label_idx, start_idx, end_idx):
+        """Clamp the plateau start_idx..end_idx around label_idx to the dividers on either side"""
+        previous, following = self.previous(label_idx), self.next(label_idx)
+        if previous is not None:
+            start_idx = max(start_idx, previous)
+        if following is not None:
+            end_idx = min(end_idx, following)
+        return start_idx, end_idx
+
+    def plateau(self, segments, label_idx):
+        """
+        Plateau around label_idx: its run in segments (a LabelSegments), cut at the dividers
+        on either side. A divider at or before label_idx starts it, one after it ends it.
+
+        Returns:
+            tuple: (start_idx, end_idx), end inclusive
+        """
+        start_idx, end_idx = segments.run_at(label_idx)[:2]
+        return self.bounds(label_idx, start_idx, end_idx - 1)  # Runs are end-exclusive
@@ -0,0 +1,123 @@
+import time
+from collections import deque
+import numpy as np
+
+class EditJournal:
+    """
+    Undo/redo history of label edits, stored as deltas instead of array copies.
+
+    Each edit is (name, start, end, old, new): the label array it changed
+    ('speed_labels' or 'pattern_labels'), the changed index range and the values
+    before and after. Edits that continue the previous one (same array and value,
+    touching range, within coalesce_seconds) are merged, so painting labels while
+    the song plays is a single undo step. The history is a ring buffer of at most
+    capacity edits; the oldest are dropped.
+    """
+
+    def __init__(self, capacity=1000, coalesce_seconds=1.0, clock=time.monotonic):
+        self.edits = deque(maxlen=capacity)
+        self.redo_stack = []
+        self.coalesce_seconds = coalesce_seconds
+        self.clock = clock
+        self.last_edit_time = None
+
+    def clear(self):
+        self.edits.clear()
+        self.redo_stack.clear()
+        self.last_edit_time = None
+
+    def write(self, name, labels, start, end, values):
+        """
+        labels[start:end] = values, recorded in the journal.
+
+        Returns:
+            bool: False if nothing changed (no journal entry)
+        """
+        start, end = max(0, start), min(len(labels), end)
+        if start >= end:
+            return False
+        new = np.broadcast_to(np.asarray(values, dtype=labels.dtype), (end - start,))
+        old = labels[start:end]
+        if np.array_equal(old, new):
+            return False
+
+        now = self.clock()
+        previous = self.edits[-1] if self.edits else None
+        if (previous is not None and previous[0] == name and not self.redo_stack
+                and self.last_edit_time is not None  # None after undo/redo: start a new edit
+                and now - self.last_edit_time <= self.coalesce_seconds
+                and start <= previous[2] and end >= previous[1]
+                and np.all(new == new[0]) and np.all(previous[4] == new[0])):
+            # Merge with the previous edit: keep its old values where the ranges overlap
+            merged_start, merged_end = min(start, previous[1]), max(end, previous[2])
+            merged_old = labels[merged_start:merged_end].copy()
+            merged_old[previous[1] - merged_start:previous[2] - merged_start] = previous[3]
+            labels[start:end] = new
+            self.edits[-1] = (name, merged_start, merged_end, merged_old,
+                              labels[merged_start:merged_end].copy())
+        else:
+            self.edits.append((name, start, end, old.copy(), new.copy()))
+            labels[start:end] = new
+
+        self.redo_stack.clear()
+        self.last_edit_time = now
+        return True
+
+    def undo(self, arrays):
+        """
+        Revert the last edit.
+
+        Args:
+            arrays (dict): Label arrays by name, changed in place
+
+        Returns:
+            tuple: The reverted (name, start, end, old, new), or None if there is nothing to undo
+        """
+        if not self.edits:
+            return None
+        edit = self.edits.pop()
+        name, start, end, old, new = edit
+        arrays[name][start:end] = old
+        self.redo_stack.append(edit)
+        self.last_edit_time = None  # Never merge into an edit across an undo
+        return edit
+
+    def redo(self, arrays):
+        """Re-apply the last undone edit, returns it or None"""
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        name, start, end, old, new = edit
+        arrays[name][start:end] = new
+        self.edits.append(edit)
+        self.last_edit_time = None
+        return edit
+
+    def replay(self, arrays):
+        """Apply every edit in the journal in order, e.g. to rebuild labels from the loaded file"""
+        for name, start, end, old, new in self.edits:
+            arrays[name][start:end] = new
+
+if __name__ == "__main__":
+    # Regression checks, run with: python edit_journal.py
+    labels = np.zeros(10, dtype=int)
+    arrays = {'speed_labels': labels}
+    journal = EditJournal(clock=lambda: 0.0)  # Every edit within the coalesce window
+
+    # An edit right after undo -> redo must be applied, not merged across the redo
+    journal.write('speed_labels', labels, 0, 3, 1)
+    journal.undo(arrays)
+    journal.redo(arrays)
+    assert journal.write('speed_labels', labels, 3, 5, 2)
+    assert labels.tolist() == [1, 1, 1, 2, 2, 0, 0, 0, 0, 0]
+    journal.undo(arrays)
+    assert labels.tolist() == [1, 1, 1, 0, 0, 0, 0, 0, 0, 0]
+
+    # Touching edits of the same value within the window are one undo step
+    journal.clear()
+    labels[:] = 0
+    journal.write('speed_labels', labels, 0, 2, 4)
+    journal.write('speed_labels', labels, 2, 4, 4)
+    journal.undo(arrays)
+    assert not labels.any()
+    print("EditJournal checks passed")
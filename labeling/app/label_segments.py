@@ -0,0 +1,62 @@
+import numpy as np
+
+class LabelSegments:
+    """
+    Run-length encoded labels. Every run is a stretch of label frames where all the
+    given label arrays keep the same value, e.g. (start, end, pattern, speed) for
+    LabelSegments(pattern_labels, speed_labels). end is exclusive.
+
+    Runs are found once with a vectorized diff/nonzero; looking up the run at a frame
+    or time is a binary search.
+    """
+
+    def __init__(self, *label_arrays, labels_per_second=10):
+        arrays = [np.asarray(labels) for labels in label_arrays]
+        n_labels = len(arrays[0])
+        self.labels_per_second = labels_per_second
+
+        if n_labels == 0:
+            self.starts = np.zeros(0, dtype=np.int64)
+            self.ends = np.zeros(0, dtype=np.int64)
+            self.values = np.zeros((0, len(arrays)), dtype=np.int64)
+            return
+
+        changed = np.zeros(n_labels - 1, dtype=bool)
+        for labels in arrays:
+            changed |= labels[1:] != labels[:-1]
+        changes = np.flatnonzero(changed) + 1
+
+        self.starts = np.concatenate(([0], changes))
+        self.ends = np.concatenate((changes, [n_labels]))
+        self.values = np.stack([labels[self.starts] for labels in arrays], axis=1)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        """Yield (start, end, value, ...) for every run"""
+        for i in range(len(self.starts)):
+            yield self.run(i)
+
+    def run(self, i):
+        """(start, end, value, ...) of run i"""
+        return (int(self.starts[i]), int(self.ends[i]), *(int(v) for v in self.values[i]))
+
+    def index_at(self, label_idx):
+        """Index of the run containing label frame label_idx"""
+        return int(np.searchsorted(self.starts, label_idx, side='right')) - 1
+
+    def run_at(self, label_idx):
+        """(start, end, value, ...) of the run containing label frame label_idx"""
+        return self.run(self.index_at(label_idx))
+
+    def run_at_time(self, time_pos):
+        """(start, end, value, ...) of the run playing at time_pos seconds"""
+        return self.run_at(int(time_pos * self.labels_per_second))
+
+    def next_change_time(self, time_pos):
+        """Time in seconds of the first run boundary after time_pos, or None at the last run"""
+        i = self.index_at(int(time_pos * self.labels_per_second))
+        if i + 1 >= len(self.starts):
+            return None
+        return self.starts[i + 1] / self.labels_per_second
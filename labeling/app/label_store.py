@@ -0,0 +1,89 @@
+import os
+import numpy as np
+from pathlib import Path
+
+class LabelStore:
+    """
+    The label file of one song, labels/<song>.labels.npz, holding only the label
+    arrays. The audio is not stored with the labels any more (it lives in the
+    AudioCache), so a save writes a few KB uncompressed and is cheap enough to run
+    on an autosave timer.
+
+    Saves go to a temp file that is renamed over the label file, so a crash or a
+    reader never sees a half-written file. An existing file that failed to load is
+    never overwritten unless the save is forced.
+    """
+
+    LABEL_KEYS = ('speed_labels', 'pattern_labels')
+
+    def __init__(self, audio_file, labels_dir="labels"):
+        self.path = Path(labels_dir) / Path(audio_file).with_suffix('.labels.npz').name
+        self.extra = {}  # Other small arrays already in the file, kept on save
+        self.saved = None  # Copies of the label arrays as last written
+        self.load_error = None  # Why the existing file could not be read, if it couldn't
+
+    def load(self, speed_labels, pattern_labels):
+        """
+        Labels from the file, or the given defaults for arrays the file doesn't have.
+
+        Returns:
+            tuple: (speed_labels, pattern_labels)
+
+        Raises:
+            Exception: Whatever reading an existing file raised. The store then keeps the
+                defaults as its saved state and refuses to save over the file (see save)
+        """
+        labels = {'speed_labels': speed_labels, 'pattern_labels': pattern_labels}
+        self.load_error = None
+        try:
+            if self.path.exists():
+                with np.load(self.path) as data:
+                    labels.update({key: data[key] for key in self.LABEL_KEYS if key in data})
+                    # Files from before labels and audio were split also hold the waveform; drop it
+                    self.extra = {key: data[key] for key in data.files
+                                  if key not in self.LABEL_KEYS and key not in ('waveform', 'sample_rate')}
+                print(f"Loaded existing labels from {self.path}")
+        except Exception as e:
+            self.load_error = e
+            labels = {'speed_labels': speed_labels, 'pattern_labels': pattern_labels}
+            raise
+        finally:
+            self.saved = {key: np.array(value, copy=True) for key, value in labels.items()}
+        return labels['speed_labels'], labels['pattern_labels']
+
+    def save(self, speed_labels, pattern_labels, force=False):
+        """
+        Atomically write the label arrays.
+
+        Args:
+            force (bool): Overwrite the file even though it failed to load
+        """
+        if self.load_error is not None and self.path.exists() and not force:
+            raise RuntimeError(f"Not overwriting {self.path}, it failed to load: {self.load_error}")
+        labels = {'speed_labels': speed_labels, 'pattern_labels': pattern_labels}
+        self.path.parent.mkdir(exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **self.extra, **labels)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.load_error = None
+        self.saved = {key: np.array(value, copy=True) for key, value in labels.items()}
+
+    def is_changed(self, speed_labels, pattern_labels):
+        """True if the labels differ from what was last loaded or saved"""
+        if self.saved is None:
+            return True
+        return not (np.array_equal(self.saved['speed_labels'], speed_labels) and
+                    np.array_equal(self.saved['pattern_labels'], pattern_labels))
+
+    def save_if_changed(self, speed_labels, pattern_labels):
+        """
+        Save only when there are unsaved edits. Returns True if the file was written.
+        Never writes over a file that failed to load.
+        """
+        if self.load_error is not None or not self.is_changed(speed_labels, pattern_labels):
+            return False
+        self.save(speed_labels, pattern_labels)
+        return True
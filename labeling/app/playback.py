@@ -0,0 +1,87 @@
+import sounddevice as sd
+from stream_clock import dac_time, anchored_position
+
+class StreamingPlayer:
+    """
+    One persistent output stream for the whole session. The callback copies straight
+    from the song array at a shared cursor, so play, pause and seek only change a flag
+    or the cursor and take effect on the next audio block (about 10 ms) instead of
+    tearing down and restarting playback. The playhead position is read from the
+    stream's own clock.
+    """
+
+    def __init__(self, sr, blocksize=256):
+        self.sr = sr
+        self.y = None
+        self.playing = False
+        self.cursor = 0  # Next sample the callback will write
+        self._seek = (0, 0)  # (request number, sample), written only by the Tk thread
+        self._seek_applied = 0  # Last request number the callback has applied
+        self._anchor = None  # (first sample of the last buffer, DAC time it plays at)
+
+        self.stream = sd.OutputStream(samplerate=sr, channels=1, dtype='float32',
+                                      blocksize=blocksize, latency='low',
+                                      callback=self._callback)
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        """Audio thread: apply a pending seek, then copy the next block of the song"""
+        seek_id, sample = self._seek
+        if seek_id != self._seek_applied:
+            self._seek_applied = seek_id
+            self.cursor = sample
+            self._anchor = None
+
+        y = self.y
+        if not self.playing or y is None:
+            outdata.fill(0)
+            return
+
+        chunk = y[self.cursor:self.cursor + frames]
+        outdata[:len(chunk), 0] = chunk
+        outdata[len(chunk):] = 0
+
+        self._anchor = (self.cursor, dac_time(self.stream, time_info))
+        self.cursor += len(chunk)
+
+        if len(chunk) < frames:
+            self.playing = False  # End of the song
+
+    def set_audio(self, y):
+        """Switch to a new song, paused at the start"""
+        self.playing = False
+        self.y = y
+        self.seek(0.0)
+
+    def play(self):
+        self._anchor = None
+        self.playing = True
+
+    def pause(self):
+        """Stop output, keeping the position that was last heard"""
+        position = self.position()
+        self.playing = False
+        self.seek(position)
+
+    def seek(self, time_pos):
+        """Move the read cursor, applied by the callback on its next block"""
+        sample = int(max(0.0, time_pos) * self.sr)
+        if self.y is not None:
+            sample = min(sample, len(self.y))
+        self._seek = (self._seek[0] + 1, sample)
+
+    def position(self):
+        """Song position in seconds of the sample playing right now"""
+        seek_id, sample = self._seek
+        if seek_id != self._seek_applied:
+            return sample / self.sr  # Seek not picked up by the callback yet
+
+        anchor = self._anchor
+        if not self.playing or anchor is None:
+            return self.cursor / self.sr
+        # Don't report the previous position before the first buffer after a seek is heard
+        return max(anchored_position(self.stream, self.sr, anchor), sample / self.sr)
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
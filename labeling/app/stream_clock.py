@@ -0,0 +1,15 @@
+# === Stream Clock ===
+# Maps an output stream's clock to song positions. The audio callback remembers which
+# sample starts the buffer it just wrote and the stream time that buffer is heard at
+# (the anchor); the position of the sample playing right now follows from the anchor
+# and the current stream time. Shared by the labeling app's player and audio_clock.py.
+
+def dac_time(stream, time_info):
+    """Stream time the buffer of the current callback reaches the speakers"""
+    # Some host APIs report a zero DAC time; fall back to now + output latency
+    return time_info.outputBufferDacTime or (time_info.currentTime + stream.latency)
+
+def anchored_position(stream, sr, anchor):
+    """Song position in seconds playing now, from an (anchor sample, DAC time) pair"""
+    sample, anchor_time = anchor
+    return sample / sr + (stream.time - anchor_time)
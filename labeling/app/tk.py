@@ -4,12 +4,17 @@ from tkinter import ttk, filedialog, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
-import librosa
-import sounddevice as sd
-import threading
+import queue
 import time
 from pathlib import Path
 import os
+from label_segments import LabelSegments
+from audio_cache import AudioCache
+from audio_loader import AudioLoader, bin_edges
+from playback import StreamingPlayer
+from label_store import LabelStore
+from edit_journal import EditJournal
+from dividers import DividerIndex
 
 class TkinterSongLabeler:
     def __init__(self, root):
@@ -24,19 +29,29 @@ class TkinterSongLabeler:
         self.audio_file = None
         self.labels_per_second = 10
         self.n_labels = 0
+        self.audio_cache = AudioCache()  # Decoded audio, so songs are only decoded once
+        self.loader = None  # AudioLoader decoding the current song in the background
+        self.audio_ready = False  # Fully decoded, playback is possible
+        self.load_progress = 0.0
+        self.envelope = None  # (n_bins, 2) waveform min/max for display, NaN until known
+        self.pyramid = None  # WaveformPyramid once the song is decoded, for zoomed views
         
         # Labels for both types
         self.speed_labels = None
         self.pattern_labels = None
         self.current_label_set = "speed"  # Current active label set
+        self.label_store = None  # LabelStore of the current song
+        self.autosave_ms = 5000  # Unsaved label edits are written this often
+        self.journal = EditJournal()  # Undo/redo history of label edits
+        self.label_segments = {}  # Label set name -> LabelSegments, dropped whenever that set changes
 
         # Plateau selection state
         self.selected_plateau = None  # (start_idx, end_idx, label_value)
         self.plateau_highlight = None  # matplotlib patch for highlighting
 
         # Plateau Dividers - Updated for multiple dividers
-        self.dividers = []  # List of divider indices
-        self.selected_divider = None  # Index of currently selected divider in self.dividers list
+        self.dividers = DividerIndex()  # Sorted divider label indices
+        self.selected_divider = None  # Label index of the currently selected divider
         self.divider_lines = []  # Visual divider lines on plot
         self.divider_colors = ['orange', 'purple', 'cyan', 'magenta', 'yellow', 'lime', 'pink', 'brown']
                 
@@ -44,21 +59,22 @@ class TkinterSongLabeler:
         self.is_playing = False
         self.position = 0.0
         self.current_label = 0
-        self.play_start_time = 0
-        self.play_start_pos = 0
-        self.play_thread = None
-        self.should_stop_playback = False
+        self.player = None  # StreamingPlayer, created once the first song is decoded
 
         self.auto_apply = True
         
         # GUI elements
         self.position_line = None
+        self.waveform_line = None
         self.label_line = None
         self.status_label = None
         self.update_timer = None
+        self.background = None  # Cached plot without the animated artists, for blitting
+        self.frame_interval_ms = 33  # Playhead refresh, ~30fps
         
         self.setup_gui()
         self.setup_bindings()
+        self.root.after(self.autosave_ms, self.autosave)
         # Bind focus reset to any widget interaction
         self.root.bind_all('<Button-1>', lambda e: self.root.after_idle(self.reset_focus))
         
@@ -217,11 +233,16 @@ class TkinterSongLabeler:
     def setup_bindings(self):
         """Setup keyboard bindings"""
         self.root.bind('<KeyPress>', self.on_key_press)
+        self.root.bind('<Control-z>', lambda e: self.undo())
+        self.root.bind('<Control-y>', lambda e: self.redo())
+        self.root.bind('<Control-Z>', lambda e: self.redo())  # Ctrl+Shift+Z
         self.root.focus_set()  # Ensure window can receive key events
         
         # Canvas click binding
         self.canvas.mpl_connect('button_press_event', self.on_canvas_click)
         self.canvas.mpl_connect('button_press_event', self.on_divider_click)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll_zoom)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
         
     
     def load_audio_file(self):
@@ -243,15 +264,57 @@ class TkinterSongLabeler:
                 messagebox.showerror("Error", f"Failed to load audio file:\n{str(e)}")
     
     def load_audio(self, file_path):
-        """Load and process audio file"""
+        """Start decoding an audio file in the background"""
+        if self.loader:
+            self.loader.cancel()
+        self.stop_playback()
+        self.flush_labels()  # Don't lose edits to the previous song
+        self.audio_ready = False
+        self.pyramid = None
+        self.play_button.config(state="disabled")
         self.status_label.config(text="Loading audio...")
-        self.root.update()
-        
-        # Load audio
-        self.y, self.sr = librosa.load(file_path)
-        self.duration = len(self.y) / self.sr
+
+        self.load_start = time.time()
+        self.loader = AudioLoader(self.audio_cache, file_path)
+        self.loader.start()
+        self.poll_loader(self.loader, file_path)
+
+    def poll_loader(self, loader, file_path):
+        """Handle messages from the background loader (runs on the Tk thread)"""
+        if loader is not self.loader:
+            return  # Another file was opened since
+
+        while True:
+            try:
+                kind, *args = loader.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "info":
+                self.on_audio_info(file_path, *args)
+            elif kind == "envelope":
+                self.on_audio_envelope(*args)
+            elif kind == "progress":
+                self.load_progress = args[0]
+            elif kind == "done":
+                self.on_audio_decoded(*args)
+                return
+            elif kind == "error":
+                self.loader = None
+                self.status_label.config(text="Loading failed")
+                messagebox.showerror("Error", f"Failed to load audio file:\n{args[0]}")
+                return
+
+        self.root.after(50, self.poll_loader, loader, file_path)
+
+    def on_audio_info(self, file_path, duration, sr):
+        """Duration is known: set up labels and the plot so labeling can start"""
+        self.sr = sr
+        self.duration = duration
         self.audio_file = file_path
-        
+        self.label_store = LabelStore(file_path)
+        self.load_progress = 0.0
+
         # Setup labels
         self.n_labels = int(self.duration * self.labels_per_second)
         self.speed_labels = np.zeros(self.n_labels, dtype=int)
@@ -259,9 +322,10 @@ class TkinterSongLabeler:
         
         # Check if existing labels file exists and load them
         self.load_existing_labels()
+        self.journal.clear()
+        self.label_segments.clear()
         
         # Reset playback state
-        self.stop_playback()
         self.is_playing = False
         self.position = 0.0
         self.current_label = 0
@@ -270,35 +334,59 @@ class TkinterSongLabeler:
         # Update GUI
         self.file_label.config(text=f"Loaded: {Path(file_path).name}")
         self.position_scale.config(to=self.duration, state="normal")
-        self.play_button.config(state="normal")
         
         # Update label spinbox range based on current type
         self.on_label_type_change()
         
-        # Setup plot
+        # Setup plot, the waveform fills in as it is decoded
+        n_bins = len(bin_edges(int(duration * sr), self.loader.n_bins)) - 1
+        self.envelope = np.full((n_bins, 2), np.nan, dtype=np.float32)
         self.setup_plot()
         
         # Start update timer
         self.start_update_timer()
 
         self.update_copy_button_states()
-        
-        self.status_label.config(text=f"Ready! {self.duration:.1f}s audio, {self.n_labels} labels")
+
+    def on_audio_envelope(self, start, mins, maxs):
+        """Fill in waveform display bins from the loader"""
+        end = min(start + len(mins), len(self.envelope))
+        self.envelope[start:end, 0] = mins[:end - start]
+        self.envelope[start:end, 1] = maxs[:end - start]
+        if self.waveform_line and self.pyramid is None:
+            self.waveform_line.set_ydata(self.envelope.ravel())
+            peak = np.nanmax(np.abs(self.envelope)) if np.isfinite(self.envelope).any() else 0
+            self.ax1.set_ylim(-1.1 * peak - 1e-3, 1.1 * peak + 1e-3)
+            self.canvas.draw_idle()
+
+    def on_audio_decoded(self, y, pyramid):
+        """Full audio is available: enable playback and zoomable waveform drawing"""
+        self.y = y
+        self.pyramid = pyramid
+        self.redraw_waveform()
+        self.canvas.draw_idle()
+
+        if self.player is None or self.player.sr != self.sr:
+            if self.player:
+                self.player.close()
+            self.player = StreamingPlayer(self.sr)
+        self.player.set_audio(y)
+        self.player.seek(self.position)
+        self.loader = None
+        self.audio_ready = True
+        self.load_progress = 1.0
+        self.play_button.config(state="normal")
+        print(f"Loaded audio in {time.time() - self.load_start:.2f}s")
     
     def load_existing_labels(self):
         """Load existing labels if the npz file exists"""
-        output_path = Path("labels") / Path(self.audio_file).with_suffix('.labels.npz').name
-        
-        if output_path.exists():
-            try:
-                data = np.load(output_path)
-                if 'speed_labels' in data:
-                    self.speed_labels = data['speed_labels']
-                if 'pattern_labels' in data:
-                    self.pattern_labels = data['pattern_labels']
-                print(f"Loaded existing labels from {output_path}")
-            except Exception as e:
-                print(f"Error loading existing labels: {e}")
+        try:
+            self.speed_labels, self.pattern_labels = self.label_store.load(self.speed_labels, self.pattern_labels)
+        except Exception as e:
+            # The store refuses to autosave over the file now, so the labels in it are not lost
+            print(f"Error loading existing labels: {e}")
+            messagebox.showerror("Error", f"Failed to load existing labels from {self.label_store.path}:\n{e}\n\n"
+                                          "Autosave is off for this song so the file is not overwritten.")
     
     def on_label_type_change(self):
         """Handle label type change"""
@@ -325,29 +413,64 @@ class TkinterSongLabeler:
     def get_current_labels(self):
         """Get the currently active label array"""
         return self.speed_labels if self.current_label_set == "speed" else self.pattern_labels
+
+    def write_labels(self, start_idx, end_idx, value, label_set=None):
+        """Set labels[start_idx:end_idx] of a label set (default: current) through the undo journal"""
+        label_set = label_set or self.current_label_set
+        name = f"{label_set}_labels"
+        self.label_segments.pop(label_set, None)
+        return self.journal.write(name, getattr(self, name), start_idx, end_idx, value)
+
+    def get_label_segments(self, label_set=None):
+        """Runs of a label set (default: current), re-encoded only after the set was edited"""
+        label_set = label_set or self.current_label_set
+        if label_set not in self.label_segments:
+            self.label_segments[label_set] = LabelSegments(getattr(self, f"{label_set}_labels"))
+        return self.label_segments[label_set]
+
+    def undo(self):
+        """Revert the last label edit (Ctrl+Z)"""
+        edit = self.journal.undo({'speed_labels': self.speed_labels, 'pattern_labels': self.pattern_labels})
+        self.after_journal_change(edit, "Undid")
+
+    def redo(self):
+        """Re-apply the last undone label edit (Ctrl+Y / Ctrl+Shift+Z)"""
+        edit = self.journal.redo({'speed_labels': self.speed_labels, 'pattern_labels': self.pattern_labels})
+        self.after_journal_change(edit, "Redid")
+
+    def after_journal_change(self, edit, action):
+        if edit is None:
+            return
+        name, start_idx, end_idx, _, _ = edit
+        self.label_segments.pop(name.removesuffix("_labels"), None)
+        if not self.label_line:
+            return
+        self.label_line.set_ydata(self.get_current_labels())
+        self.blit()
+        self.update_copy_button_states()
+        print(f"{action} edit of {name} {start_idx}-{end_idx - 1}")
     
     def setup_plot(self):
         """Setup the matplotlib plots"""
         self.ax1.clear()
         self.ax2.clear()
         
-        # Downsample waveform for display
-        step = max(1, len(self.y) // 2000)
-        times = np.linspace(0, self.duration, len(self.y[::step]))
-        
-        # Waveform plot
-        self.ax1.plot(times, self.y[::step], 'b-', alpha=0.6, linewidth=0.5)
-        self.position_line = self.ax1.axvline(0, color='red', linewidth=2)
+        # Waveform plot, min and max of every display bin
+        times = np.repeat(np.linspace(0, self.duration, len(self.envelope)), 2)
+        self.waveform_line, = self.ax1.plot(times, self.envelope.ravel(), 'b-', alpha=0.6, linewidth=0.5)
+        self.position_line = self.ax1.axvline(0, color='red', linewidth=2, animated=True)
         self.ax1.set_ylabel('Waveform')
+        self.ax1.set_xlim(0, self.duration)
         self.ax1.grid(True, alpha=0.3)
         
         # Labels plot
         label_times = np.linspace(0, self.duration, self.n_labels)
         current_labels = self.get_current_labels()
-        self.label_line, = self.ax2.plot(label_times, current_labels, 'g-', linewidth=2)
-        self.position_line_labels = self.ax2.axvline(0, color='red', linewidth=2)  # vertical marker
+        self.label_line, = self.ax2.plot(label_times, current_labels, 'g-', linewidth=2, animated=True)
+        self.position_line_labels = self.ax2.axvline(0, color='red', linewidth=2, animated=True)  # vertical marker
 
         self.plateau_highlight = None
+        self.divider_lines.clear()  # ax2.clear() removed them
         
         label_type_str = "Speed" if self.current_label_set == "speed" else "Pattern"
         self.ax2.set_ylabel(f'{label_type_str} Labels')
@@ -355,11 +478,64 @@ class TkinterSongLabeler:
         
         y_max = 9.5 if self.current_label_set == "speed" else 8.5
         self.ax2.set_ylim(0, y_max)
+        self.ax2.set_xlim(0, self.duration)
         self.ax2.grid(True, alpha=0.3)
         
         self.fig.tight_layout()
         self.canvas.draw()
     
+    def animated_artists(self):
+        """Artists redrawn on every frame on top of the cached background"""
+        artists = [self.label_line, self.plateau_highlight, *self.divider_lines,
+                   self.position_line, getattr(self, 'position_line_labels', None)]
+        return [artist for artist in artists if artist is not None]
+
+    def on_draw(self, event):
+        """After a full redraw, cache the static background and draw the animated artists on it"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self.animated_artists():
+            self.fig.draw_artist(artist)
+
+    def blit(self):
+        """Redraw only the animated artists (playhead, labels, highlight, dividers)"""
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        for artist in self.animated_artists():
+            self.fig.draw_artist(artist)
+        self.canvas.blit(self.fig.bbox)
+
+    def redraw_waveform(self):
+        """Draw the waveform envelope for the visible time range from the pyramid"""
+        if self.pyramid is None or not self.waveform_line:
+            return
+        start_time, end_time = self.ax1.get_xlim()
+        times, values = self.pyramid.envelope(self.y, start_time, end_time)
+        self.waveform_line.set_data(times, values)
+        if len(values):
+            peak = np.abs(values).max()
+            self.ax1.set_ylim(-1.1 * peak - 1e-3, 1.1 * peak + 1e-3)
+
+    def set_view(self, start_time, end_time):
+        """Show start_time..end_time seconds in both plots"""
+        width = min(end_time - start_time, self.duration)
+        start_time = max(0, min(start_time, self.duration - width))
+        self.ax1.set_xlim(start_time, start_time + width)
+        self.ax2.set_xlim(start_time, start_time + width)
+        self.redraw_waveform()
+        self.canvas.draw_idle()
+
+    def on_scroll_zoom(self, event):
+        """Scroll wheel zooms both plots around the mouse position"""
+        if event.inaxes not in (self.ax1, self.ax2) or event.xdata is None or not self.audio_file:
+            return
+        scale = 0.8 if event.button == 'up' else 1.25
+        start_time, end_time = self.ax1.get_xlim()
+        new_width = max(0.5, min((end_time - start_time) * scale, self.duration))
+        fraction = (event.xdata - start_time) / (end_time - start_time)
+        self.set_view(event.xdata - fraction * new_width, event.xdata + (1 - fraction) * new_width)
+
     def update_plot_labels(self):
         """Update plot with current label type"""
         if self.ax2 and self.label_line:
@@ -374,7 +550,7 @@ class TkinterSongLabeler:
             self.canvas.draw()
     
     def start_update_timer(self):
-        """Start the update timer for 10fps updates"""
+        """Start the display update timer"""
         if self.update_timer:
             self.root.after_cancel(self.update_timer)
         self.update_display()
@@ -395,26 +571,15 @@ class TkinterSongLabeler:
         
         # Update position
         self.position = new_position
-        
-        # If we're playing and position changed significantly, restart playback
-        if self.is_playing and abs(new_position - old_position) > 0.1:
-            self.stop_playback()
-            self.play_from_position()
+        if self.player:
+            self.player.seek(new_position)
 
     def on_divider_click(self, event):
         """Handle clicking on dividers to select them"""
         if event.inaxes == self.ax2 and event.xdata is not None and event.button == 1:  # Left click
-            # Check if click is near any divider
-            click_time = event.xdata
-            closest_divider = None
-            min_distance = float('inf')
-            
-            for i, divider_idx in enumerate(self.dividers):
-                divider_time = divider_idx / self.labels_per_second
-                distance = abs(click_time - divider_time)
-                if distance < 0.5 and distance < min_distance:  # Within 0.5 second tolerance
-                    min_distance = distance
-                    closest_divider = i
+            # Check if click is near any divider (within 0.5 second tolerance)
+            closest_divider = self.dividers.nearest(event.xdata * self.labels_per_second,
+                                                    max_distance=0.5 * self.labels_per_second)
             
             if closest_divider is not None:
                 self.selected_divider = closest_divider
@@ -426,10 +591,6 @@ class TkinterSongLabeler:
 
     def update_selected_divider_display(self):
         """Update the display to show which divider is selected"""
-        if self.selected_divider is not None:
-            divider_idx = self.dividers[self.selected_divider]
-            time_pos = divider_idx / self.labels_per_second
-        
         # Update visual display
         self.update_divider_display()
 
@@ -442,23 +603,21 @@ class TkinterSongLabeler:
         frame_size = 1  # 1 label index = 1 frame
         
         # Get current divider index
-        current_idx = self.dividers[self.selected_divider]
+        current_idx = self.selected_divider
         new_idx = current_idx + (direction * frame_size)
         
         # Clamp to valid range
         new_idx = max(0, min(new_idx, self.n_labels - 1))
         
-        # Update divider position
-        self.dividers[self.selected_divider] = new_idx
+        # Update divider position (it stays put if another divider is already there)
+        new_idx = self.dividers.move(current_idx, new_idx)
+        self.selected_divider = new_idx
         
         # Update audio position to the new divider location
         new_time = new_idx / self.labels_per_second
         self.position = new_time
-        
-        # If playing, restart from new position
-        if self.is_playing:
-            self.stop_playback()
-            self.play_from_position()
+        if self.player:
+            self.player.seek(new_time)
         
         # Update displays
         self.update_selected_divider_display()
@@ -468,7 +627,8 @@ class TkinterSongLabeler:
         """Delete the currently selected divider"""
         if self.selected_divider is not None:
             # Remove the divider
-            removed_idx = self.dividers.pop(self.selected_divider)
+            removed_idx = self.selected_divider
+            self.dividers.remove(removed_idx)
             print(f"Deleted divider at index {removed_idx}")
 
             # Clear selection
@@ -479,17 +639,17 @@ class TkinterSongLabeler:
             print("No divider selected")
     
     def update_display(self):
-        """Update display periodically (10fps)"""
+        """Update display periodically (~30fps), blitting only what moves"""
         if not self.audio_file:
             return
             
         # Update position if playing
-        if self.is_playing and not self.should_stop_playback:
-            elapsed = time.time() - self.play_start_time
-            new_position = self.play_start_pos + elapsed
+        if self.is_playing:
+            # Position of what is being heard, from the stream clock
+            new_position = self.player.position()
             
             # Check if we've reached the end
-            if new_position >= self.duration:
+            if not self.player.playing or new_position >= self.duration:
                 self.stop_playback()
                 self.position = self.duration
             else:
@@ -503,6 +663,11 @@ class TkinterSongLabeler:
         self.position_var.set(self.position)
         self.position_label.config(text=f"{self.position:.1f}s / {self.duration:.1f}s")
         
+        # Keep the playhead in view while zoomed in
+        start_time, end_time = self.ax1.get_xlim()
+        if self.is_playing and not start_time <= self.position <= end_time:
+            self.set_view(self.position, self.position + end_time - start_time)
+
         # Update plot
         if self.position_line:
             self.position_line.set_xdata([self.position, self.position])
@@ -515,18 +680,20 @@ class TkinterSongLabeler:
         # Update status
         status_text = f"Label: {self.current_label} | Position: {self.position:.1f}s | "
         status_text += f"Playing: {self.is_playing} | Mode: {self.current_label_set.title()}"
+        if not self.audio_ready:
+            status_text += f" | Decoding audio {self.load_progress:.0%}"
         self.status_label.config(text=status_text)
         
         # Update play button text
         self.play_button.config(text="Pause" if self.is_playing else "Play")
         
         try:
-            self.canvas.draw_idle()
+            self.blit()
         except:
             pass
         
-        # Schedule next update (100ms = 10fps)
-        self.update_timer = self.root.after(100, self.update_display)
+        # Schedule next update
+        self.update_timer = self.root.after(self.frame_interval_ms, self.update_display)
     
     def on_key_press(self, event):
         """Handle keyboard input"""
@@ -608,24 +775,9 @@ class TkinterSongLabeler:
         
         label_value = current_labels[label_idx]
         
-        # Get sorted divider positions (sorted)
-        dividers = sorted(self.dividers)
-        
-        # Find start of plateau (go backwards until value changes or hit a divider)
-        start_idx = label_idx
-        while start_idx > 0 and current_labels[start_idx - 1] == label_value:
-            # Check if we hit a divider
-            if start_idx in dividers:
-                break
-            start_idx -= 1
-        
-        # Find end of plateau (go forwards until value changes or hit a divider)
-        end_idx = label_idx
-        while end_idx < len(current_labels) - 1 and current_labels[end_idx + 1] == label_value:
-            # Check if we hit a divider
-            end_idx += 1 # move to the position first since we'ere checking the end
-            if end_idx in dividers:
-                break
+        # Run of equal values around the position (cached run-length encoding + binary
+        # search), cut at the dividers on either side
+        start_idx, end_idx = self.dividers.plateau(self.get_label_segments(), label_idx)
         
         return (start_idx, end_idx, label_value)
     
@@ -643,8 +795,8 @@ class TkinterSongLabeler:
         y_max = 9.5 if self.current_label_set == "speed" else 8.5
         self.plateau_highlight = self.ax2.axvspan(start_time, end_time, 
                                                 alpha=0.3, color='yellow', 
-                                                zorder=10)
-        self.canvas.draw()
+                                                zorder=10, animated=True)
+        self.blit()
 
     def clear_plateau_selection(self):
         """Clear the current plateau selection and highlighting"""
@@ -652,7 +804,7 @@ class TkinterSongLabeler:
         if self.plateau_highlight:
             self.plateau_highlight.remove()
             self.plateau_highlight = None
-            self.canvas.draw()
+            self.blit()
         
         # Clear selection
         self.selected_plateau = None
@@ -709,7 +861,7 @@ class TkinterSongLabeler:
             if self.plateau_highlight:
                 self.plateau_highlight.remove()
                 self.plateau_highlight = None
-                self.canvas.draw()
+                self.blit()
             popup.destroy()
         
         ttk.Button(button_frame, text="Apply", command=apply_change).pack(side=tk.LEFT, padx=(0, 5))
@@ -731,11 +883,8 @@ class TkinterSongLabeler:
         if not self.confirm_copy_operation("speed labels", "pattern labels"):
             return
         
-        # Copy speed labels to pattern labels
-        self.pattern_labels = self.speed_labels.copy()
-        
-        # Clamp pattern labels to valid range (0-7)
-        self.pattern_labels = np.clip(self.pattern_labels, 0, 8)
+        # Copy speed labels to pattern labels, clamped to the valid range (0-8)
+        self.write_labels(0, len(self.pattern_labels), np.clip(self.speed_labels, 0, 8), "pattern")
         
         # Update display
         self.update_plot_labels()
@@ -749,7 +898,7 @@ class TkinterSongLabeler:
             return
         
         # Copy pattern labels to speed labels
-        self.speed_labels = self.pattern_labels.copy()
+        self.write_labels(0, len(self.speed_labels), self.pattern_labels, "speed")
         
         # Update display
         self.update_plot_labels()
@@ -791,12 +940,13 @@ class TkinterSongLabeler:
     def apply_plateau_change(self, start_idx, end_idx, new_value):
         """Apply the new value to the selected plateau"""
         current_labels = self.get_current_labels()
-        current_labels[start_idx:end_idx + 1] = new_value
+        self.write_labels(start_idx, end_idx + 1, new_value)
 
         self.clear_plateau_selection()
         
-        # Update plot
-        self.update_plot_labels()
+        # Update plot (only the label line changed)
+        self.label_line.set_ydata(current_labels)
+        self.blit()
 
         self.update_copy_button_states()
         
@@ -812,15 +962,11 @@ class TkinterSongLabeler:
         if label_idx < 0 or label_idx >= self.n_labels:
             return
         
-        # Check if divider already exists at this position
-        if label_idx in self.dividers:
+        # Add new divider, unless one already exists at this position
+        if not self.dividers.add(label_idx):
             print(f"Divider already exists at index {label_idx}")
             return
         
-        # Add new divider
-        self.dividers.append(label_idx)
-        self.dividers.sort()  # Keep dividers sorted
-        
         print(f"Inserted divider at index {label_idx} (time: {self.position:.2f}s)")
         self.update_divider_display()
 
@@ -831,22 +977,24 @@ class TkinterSongLabeler:
             line.remove()
         self.divider_lines.clear()
         
-        # Add divider lines
-        for i, divider_idx in enumerate(self.dividers):
-            time_pos = divider_idx / self.labels_per_second
+        # All dividers as one collection, so hundreds of them stay cheap to draw
+        if len(self.dividers):
+            times = [divider_idx / self.labels_per_second for divider_idx in self.dividers]
+            colors = [self.divider_colors[i % len(self.divider_colors)] for i in range(len(times))]
+            lines = self.ax2.vlines(times, 0, 1, transform=self.ax2.get_xaxis_transform(),
+                                    colors=colors, linewidth=1, linestyle='-', alpha=0.8,
+                                    zorder=15, animated=True)
+            self.divider_lines.append(lines)
+        
+        # Make selected divider thicker and more opaque
+        if self.selected_divider is not None:
+            i = self.dividers.rank(self.selected_divider)
             color = self.divider_colors[i % len(self.divider_colors)]
-            
-            # Make selected divider thicker and more opaque
-            if i == self.selected_divider:
-                line = self.ax2.axvline(time_pos, color=color, linewidth=2, 
-                                    linestyle='-', alpha=1.0, zorder=20)
-            else:
-                line = self.ax2.axvline(time_pos, color=color, linewidth=1, 
-                                    linestyle='-', alpha=0.8, zorder=15)
-            
+            line = self.ax2.axvline(self.selected_divider / self.labels_per_second, color=color,
+                                    linewidth=2, linestyle='-', alpha=1.0, zorder=20, animated=True)
             self.divider_lines.append(line)
         
-        self.canvas.draw()
+        self.blit()
     
     def on_position_change(self, value):
         """Handle position scale change"""
@@ -858,23 +1006,16 @@ class TkinterSongLabeler:
         self.current_label = self.current_label_var.get()
     
     def stop_playback(self):
-        """Stop current playback completely"""
-        self.should_stop_playback = True
-        sd.stop()
-        if self.play_thread and self.play_thread.is_alive():
-            self.play_thread.join(timeout=0.1)  # Brief wait for thread cleanup
+        """Pause playback, the output stream keeps running"""
+        if self.player and self.is_playing:
+            self.player.pause()
         self.is_playing = False
-        self.should_stop_playback = False
     
     def seek(self, time_pos):
-        """Jump to position"""
-        old_position = self.position
+        """Jump to position, playback continues from there without restarting"""
         self.position = max(0, min(time_pos, self.duration))
-        
-        # If we're playing and position changed significantly, restart playback
-        if self.is_playing and abs(self.position - old_position) > 0.1:
-            self.stop_playback()
-            self.play_from_position()
+        if self.player:
+            self.player.seek(self.position)
     
     def toggle_play(self):
         """Play/pause toggle"""
@@ -885,33 +1026,11 @@ class TkinterSongLabeler:
     
     def play_from_position(self):
         """Start playback from current position"""
-        # Stop any existing playback first
-        self.stop_playback()
-        
-        start_sample = int(self.position * self.sr)
-        audio_chunk = self.y[start_sample:]
-        
-        if len(audio_chunk) > 100:  # Minimum chunk size
-            self.is_playing = True
-            self.play_start_time = time.time()
-            self.play_start_pos = self.position
-            self.should_stop_playback = False
-            
-            def play():
-                try:
-                    # Check if we should stop before starting
-                    if not self.should_stop_playback:
-                        sd.play(audio_chunk, self.sr)
-                        sd.wait()
-                    
-                    # Only set to False if this thread wasn't interrupted
-                    if not self.should_stop_playback:
-                        self.is_playing = False
-                except Exception as e:
-                    self.is_playing = False
-            
-            self.play_thread = threading.Thread(target=play, daemon=True)
-            self.play_thread.start()
+        if not self.audio_ready or self.position >= self.duration:
+            return
+        self.player.seek(self.position)
+        self.player.play()
+        self.is_playing = True
 
     def toggle_auto_apply(self):
         """Toggle auto-apply mode"""
@@ -929,7 +1048,7 @@ class TkinterSongLabeler:
             window = max(1, self.labels_per_second // 4)  # 0.25 second window
             start = max(0, label_idx - window//2)
             end = min(len(current_labels), label_idx + window//2)
-            current_labels[start:end] = self.current_label
+            self.write_labels(start, end, self.current_label)
 
         self.update_copy_button_states()
 
@@ -947,39 +1066,44 @@ class TkinterSongLabeler:
         end_idx = min(len(current_labels), end_idx)
         
         if start_idx < end_idx:
-            current_labels[start_idx:end_idx] = self.current_label
+            self.write_labels(start_idx, end_idx, self.current_label)
 
     def save_labels(self):
-        """Save labels and waveform to a compressed .npz file"""
+        """Save the labels (only the label arrays, the audio stays in the cache)"""
         if not self.audio_file:
             messagebox.showwarning("Warning", "No audio loaded")
             return
 
+        force = False
+        if self.label_store.load_error is not None and self.label_store.path.exists():
+            force = messagebox.askyesno("Overwrite Labels",
+                                        f"{self.label_store.path} failed to load:\n{self.label_store.load_error}\n\n"
+                                        "Overwrite it with the current labels?", icon='warning', default='no')
+            if not force:
+                return
+
         try:
-            # Ensure labels directory exists
-            labels_dir = Path("labels")
-            labels_dir.mkdir(exist_ok=True)
-            
-            output_path = labels_dir / Path(self.audio_file).with_suffix('.labels.npz').name
-            
-            # Check if file already exists
-            existing_data = {}
-            if output_path.exists():
-                existing_data = dict(np.load(output_path))
-            
-            existing_data['waveform'] = self.y
-            existing_data['sample_rate'] = self.sr
-            existing_data['speed_labels'] = self.speed_labels
-            existing_data['pattern_labels'] = self.pattern_labels
-            
-            # Save everything
-            np.savez_compressed(output_path, **existing_data)
-            
-            messagebox.showinfo("Success", f"labels saved to:\n{output_path}")
+            self.label_store.save(self.speed_labels, self.pattern_labels, force=force)
+            messagebox.showinfo("Success", f"labels saved to:\n{self.label_store.path}")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save labels:\n{str(e)}")
 
+    def flush_labels(self):
+        """Write the labels if they changed since the last save"""
+        if self.label_store is None or self.speed_labels is None:
+            return
+        try:
+            if self.label_store.save_if_changed(self.speed_labels, self.pattern_labels):
+                print(f"Autosaved labels to {self.label_store.path}")
+        except Exception as e:
+            print(f"Error autosaving labels: {e}")
+
+    def autosave(self):
+        """Periodic autosave of unsaved label edits"""
+        self.flush_labels()
+        self.root.after(self.autosave_ms, self.autosave)
+
 def main():
     root = tk.Tk()
     app = TkinterSongLabeler(root)
@@ -989,8 +1113,10 @@ def main():
     except KeyboardInterrupt:
         pass
     finally:
+        app.flush_labels()
         # Stop any playing audio
-        sd.stop()
+        if app.player:
+            app.player.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
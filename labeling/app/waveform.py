@@ -0,0 +1,96 @@
+import os
+import numpy as np
+
+class WaveformPyramid:
+    """
+    Min/max envelope of a song at every zoom level, for drawing the waveform plot.
+
+    Level 0 holds the min and max of every base_block samples, each following level
+    merges pairs of bins of the level below. A view of any width is drawn from the
+    finest level that still fits in max_points bins, so transients stay visible
+    without ever plotting more than about 2 * max_points points.
+    """
+
+    def __init__(self, mins, maxs, sr, n_samples, base_block=256):
+        """
+        Args:
+            mins, maxs (list of np.ndarray): Bin minimums/maximums per level, finest first
+            sr (int): Sample rate of the audio
+            n_samples (int): Length of the audio
+            base_block (int): Samples per level 0 bin
+        """
+        self.mins = mins
+        self.maxs = maxs
+        self.sr = sr
+        self.n_samples = n_samples
+        self.base_block = base_block
+
+    @classmethod
+    def build(cls, y, sr, base_block=256):
+        """Compute all levels with vectorized reductions"""
+        n_bins = -(-len(y) // base_block)
+        padded = np.empty(n_bins * base_block, dtype=np.float32)
+        padded[:len(y)] = y
+        padded[len(y):] = y[-1] if len(y) else 0  # Repeat the last sample so padding doesn't change min/max
+
+        blocks = padded.reshape(n_bins, base_block)
+        mins = [blocks.min(axis=1)]
+        maxs = [blocks.max(axis=1)]
+        while len(mins[-1]) > 1:
+            lo, hi = mins[-1], maxs[-1]
+            if len(lo) % 2:
+                lo = np.append(lo, lo[-1])
+                hi = np.append(hi, hi[-1])
+            mins.append(np.minimum(lo[0::2], lo[1::2]))
+            maxs.append(np.maximum(hi[0::2], hi[1::2]))
+
+        return cls(mins, maxs, sr, len(y), base_block)
+
+    def save(self, path):
+        """Write all levels to one .npz (via a temp file, so readers never see half a file)"""
+        path = str(path)
+        tmp_path = path[:-len(".npz")] + ".tmp.npz"
+        np.savez(tmp_path, mins=np.concatenate(self.mins), maxs=np.concatenate(self.maxs),
+                 lengths=np.array([len(level) for level in self.mins]),
+                 sr=self.sr, n_samples=self.n_samples, base_block=self.base_block)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            splits = np.cumsum(data['lengths'])[:-1]
+            return cls(np.split(data['mins'], splits), np.split(data['maxs'], splits),
+                       int(data['sr']), int(data['n_samples']), int(data['base_block']))
+
+    def envelope(self, y, start_time, end_time, max_points=2000):
+        """
+        Points to plot for the view start_time..end_time seconds.
+
+        Args:
+            y (np.ndarray): The audio, used directly once the view is narrower than max_points samples
+            start_time, end_time (float): Visible time range
+            max_points (int): Most bins to draw
+
+        Returns:
+            tuple: (times, values), min and max of each bin alternating
+        """
+        start = max(0, int(start_time * self.sr))
+        end = max(start, min(self.n_samples, int(np.ceil(end_time * self.sr)) + 1))
+        if end <= start:
+            # Nothing of the song in view (e.g. end_time before 0 or before start_time)
+            return np.zeros(0), np.zeros(0, dtype=np.float32)
+        if end - start <= max_points:
+            return np.arange(start, end) / self.sr, np.asarray(y[start:end])
+
+        # Finest level with no more than max_points bins in view
+        needed = (end - start) / (max_points * self.base_block)
+        level = min(max(0, int(np.ceil(np.log2(needed)))), len(self.mins) - 1)
+        block = self.base_block << level
+
+        first = start // block
+        last = min(len(self.mins[level]), -(-end // block))
+        values = np.empty((last - first, 2), dtype=np.float32)
+        values[:, 0] = self.mins[level][first:last]
+        values[:, 1] = self.maxs[level][first:last]
+        times = np.repeat(np.arange(first, last) * block / self.sr, 2)
+        return times, values.ravel()
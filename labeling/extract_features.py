@@ -0,0 +1,123 @@
+# === Batch Feature Extraction ===
+# Computes MFCCs for every song in playlist_wavs on all cores and writes them with the
+# song's labels to labels/<song>.mfcc_labels.npz, the file lasersFromLabels.py loads.
+# Labels come from the labeling app (app/labels); for songs it has no labels for, the
+# labels already in the .npz (e.g. saved by tk_withStem) are kept.
+# MFCC frames use hop = sr / labels_per_second, so frame i lines up with label i.
+# The features themselves come from the FeatureStore, so a song is only decoded when
+# one of the requested features has not been computed for it yet.
+# Run from the labeling directory (like gather_wavs.py).
+
+import argparse
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from feature_store import FeatureStore, RECIPES, recipe_hash
+
+AUDIO_SUFFIXES = {".wav", ".mp3", ".flac", ".m4a", ".aac"}
+LABEL_KEYS = ('pattern_labels', 'speed_labels')
+
+def output_path(audio_path, labels_dir):
+    return Path(labels_dir) / f"{audio_path.stem}.mfcc_labels.npz"
+
+def labels_path(audio_path, app_labels_dir):
+    """Label file the labeling app saves for a song"""
+    return Path(app_labels_dir) / f"{audio_path.stem}.labels.npz"
+
+def recipe_keys(feature_names):
+    """<feature>-<recipe hash> of every feature, recorded in the feature file"""
+    return [f"{name}-{recipe_hash(RECIPES[name])}" for name in feature_names]
+
+def is_up_to_date(audio_path, labels_dir, app_labels_dir, feature_names):
+    """
+    True if the feature file is newer than the audio and the song's labels, and holds
+    every requested feature with its current recipe
+    """
+    out = output_path(audio_path, labels_dir)
+    if not out.exists():
+        return False
+    sources = [audio_path, labels_path(audio_path, app_labels_dir)]
+    newest = max(p.stat().st_mtime for p in sources if p.exists())
+    if out.stat().st_mtime < newest:
+        return False
+    with np.load(out) as data:  # Only reads the archive's directory and the small recipe array
+        stored = set(data['recipes']) if 'recipes' in data.files else set()
+    return stored.issuperset(recipe_keys(feature_names))
+
+def extract_song(audio_path, labels_dir, app_labels_dir, features_dir, feature_names):
+    """
+    Worker: compute (or fetch) the song's features on the label grid and write the feature file.
+
+    Returns:
+        tuple: (song name, number of frames, seconds taken)
+    """
+    start = time.perf_counter()
+    features = FeatureStore(features_dir).get(audio_path, feature_names)
+
+    data = {name: np.asarray(values) for name, values in features.items()}
+    out = output_path(audio_path, labels_dir)
+    song_labels = labels_path(audio_path, app_labels_dir)
+    if song_labels.exists():
+        with np.load(song_labels) as labels:
+            data['pattern_labels'] = labels['pattern_labels']
+            data['speed_labels'] = labels['speed_labels']
+    elif out.exists():
+        # No app labels: keep labels already in the feature file (e.g. saved by tk_withStem)
+        with np.load(out) as existing:
+            for key in LABEL_KEYS:
+                if key in existing.files:
+                    data[key] = existing[key]
+
+    # Trim everything to the same number of frames
+    n_frames = min(len(array) for array in data.values())
+    data = {key: array[:n_frames] for key, array in data.items()}
+    data['recipes'] = np.array(recipe_keys(feature_names))
+
+    tmp_path = out.with_name(out.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **data)
+    os.replace(tmp_path, out)
+
+    return audio_path.stem, n_frames, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute MFCC features for all songs on all cores")
+    parser.add_argument("--audio-dir", default="playlist_wavs", help="Directory with the songs")
+    parser.add_argument("--labels-dir", default="labels", help="Where <song>.mfcc_labels.npz is written")
+    parser.add_argument("--app-labels-dir", default="app/labels", help="Where the labeling app saves <song>.labels.npz")
+    parser.add_argument("--features-dir", default="features", help="FeatureStore directory")
+    parser.add_argument("--features", nargs="+", default=["mfcc"], choices=sorted(RECIPES),
+                        help="Features to compute and write to the .npz")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--force", action="store_true", help="Recompute songs that are up to date")
+    args = parser.parse_args()
+
+    Path(args.labels_dir).mkdir(exist_ok=True)
+    songs = sorted(p for p in Path(args.audio_dir).iterdir() if p.suffix.lower() in AUDIO_SUFFIXES)
+    todo = [p for p in songs
+            if args.force or not is_up_to_date(p, args.labels_dir, args.app_labels_dir, args.features)]
+    print(f"{len(songs)} songs, {len(songs) - len(todo)} up to date, extracting {len(todo)} on {args.workers} workers")
+    if not todo:
+        return
+
+    start = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(extract_song, p, args.labels_dir, args.app_labels_dir,
+                               args.features_dir, args.features): p for p in todo}
+        for future in as_completed(futures):
+            try:
+                name, n_frames, elapsed = future.result()
+            except Exception as e:
+                print(f"Failed: {futures[future].name}: {e}")
+                continue
+            done += 1
+            print(f"[{done}/{len(todo)}] {name}: {n_frames} frames in {elapsed:.1f}s")
+
+    total = time.perf_counter() - start
+    print(f"Extracted {done} songs in {total:.1f}s ({done / total * 60:.1f} songs/minute)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# === Feature Store ===
+# Content-addressed store of per-song audio features. Every feature array is keyed by
+# the hash of the audio file's contents and the hash of its recipe (feature name and
+# parameters), and saved as its own .npy file that is opened memory-mapped:
+#
+#   features/<audio hash>/<feature>-<recipe hash>.npy   (frames, ...) float32
+#   features/<audio hash>/<feature>-<recipe hash>.json  the recipe, for reference
+#
+# A feature is only computed once per song and recipe; changing a parameter gives a
+# new recipe hash and the old arrays stay valid for whoever still asks for them.
+# Audio is decoded only when a requested feature is missing.
+
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+from streaming_mfcc import StreamingMFCC, TOP_DB, PEAK_DB
+
+SAMPLE_RATE = 22050
+LABELS_PER_SECOND = 10
+HOP_LENGTH = SAMPLE_RATE // LABELS_PER_SECOND  # One frame per label
+
+# Default recipes, all on the 10 fps label grid. MFCCs come from StreamingMFCC, so live
+# mode (liveLasers.py) computes exactly the features the models were trained on
+RECIPES = {
+    'mfcc': {'feature': 'mfcc', 'sr': SAMPLE_RATE, 'hop_length': HOP_LENGTH, 'n_mfcc': 20,
+             'top_db': TOP_DB, 'peak_db': PEAK_DB},
+    'chroma': {'feature': 'chroma', 'sr': SAMPLE_RATE, 'hop_length': HOP_LENGTH, 'n_chroma': 12},
+    'onset': {'feature': 'onset', 'sr': SAMPLE_RATE, 'hop_length': HOP_LENGTH},
+    'rms': {'feature': 'rms', 'sr': SAMPLE_RATE, 'hop_length': HOP_LENGTH},
+    'tempo': {'feature': 'tempo', 'sr': SAMPLE_RATE, 'hop_length': HOP_LENGTH},
+}
+
+def recipe_hash(recipe):
+    """Stable short hash of a recipe dict"""
+    return hashlib.sha1(json.dumps(recipe, sort_keys=True).encode()).hexdigest()[:12]
+
+def compute_feature(y, recipe):
+    """
+    Compute one feature from decoded audio.
+
+    Returns:
+        np.ndarray: float32, one row per frame
+    """
+    import librosa
+
+    params = {key: value for key, value in recipe.items() if key != 'feature'}
+    sr, hop_length = params.pop('sr'), params.pop('hop_length')
+    name = recipe['feature']
+
+    if name == 'mfcc':
+        extractor = StreamingMFCC(sr=sr, hop_length=hop_length, **params)
+        values = np.concatenate([extractor.process(y), extractor.flush()])
+    elif name == 'chroma':
+        values = librosa.feature.chroma_stft(y=y, sr=sr, hop_length=hop_length, **params).T
+    elif name == 'onset':
+        values = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length, **params)
+    elif name == 'rms':
+        values = librosa.feature.rms(y=y, hop_length=hop_length, **params)[0]
+    elif name == 'tempo':
+        # Local tempo estimate (BPM) per frame
+        onset = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+        values = librosa.feature.tempo(onset_envelope=onset, sr=sr, hop_length=hop_length,
+                                       aggregate=None, **params)
+    else:
+        raise ValueError(f"Unknown feature: {name}")
+    return np.ascontiguousarray(values, dtype=np.float32)
+
+class FeatureStore:
+    def __init__(self, root="features"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._hashes = {}  # (path, size, mtime) -> audio hash, so a file is hashed once per run
+
+    def audio_hash(self, audio_path):
+        """BLAKE2 hash of the audio file's contents"""
+        stat = os.stat(audio_path)
+        memo_key = (str(Path(audio_path).resolve()), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._hashes:
+            digest = hashlib.blake2b(digest_size=16)
+            with open(audio_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            self._hashes[memo_key] = digest.hexdigest()
+        return self._hashes[memo_key]
+
+    def path(self, audio_hash, recipe):
+        return self.root / audio_hash / f"{recipe['feature']}-{recipe_hash(recipe)}.npy"
+
+    def get(self, audio_path, names=tuple(RECIPES), recipes=None):
+        """
+        Features for a song, computing and storing any that are missing.
+
+        Args:
+            audio_path: Song file
+            names: Feature names to return (keys of recipes)
+            recipes (dict): Recipes by name, defaults to RECIPES
+
+        Returns:
+            dict: Read-only memory-mapped array per name
+        """
+        recipes = recipes or RECIPES
+        audio_hash = self.audio_hash(audio_path)
+        paths = {name: self.path(audio_hash, recipes[name]) for name in names}
+
+        missing = [name for name in names if not paths[name].exists()]
+        if missing:
+            import librosa
+
+            # Decode once at each sample rate the missing recipes need
+            decoded = {}
+            for name in missing:
+                recipe = recipes[name]
+                if recipe['sr'] not in decoded:
+                    decoded[recipe['sr']], _ = librosa.load(audio_path, sr=recipe['sr'])
+                self.put(paths[name], recipe, compute_feature(decoded[recipe['sr']], recipe))
+
+        return {name: np.load(paths[name], mmap_mode='r') for name in names}
+
+    def put(self, path, recipe, values):
+        """Atomically write a feature array and its recipe"""
+        path.parent.mkdir(exist_ok=True)
+        # A unique temp file, so workers storing the same song (duplicate audio) don't collide
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.stem + ".", suffix=".tmp",
+                                         delete=False) as f:
+            np.save(f, values)
+        os.replace(f.name, path)
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump(recipe, f, indent=2, sort_keys=True)
+
+    def has(self, audio_path, names=tuple(RECIPES), recipes=None):
+        """True if all the named features are already stored for a song"""
+        recipes = recipes or RECIPES
+        audio_hash = self.audio_hash(audio_path)
+        return all(self.path(audio_hash, recipes[name]).exists() for name in names)
+
+def aligned(features, *arrays):
+    """Trim feature arrays (and e.g. label arrays) to their common number of frames"""
+    n_frames = min(len(array) for array in [*features.values(), *arrays])
+    return {name: values[:n_frames] for name, values in features.items()}, [array[:n_frames] for array in arrays]
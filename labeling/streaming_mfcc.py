@@ -0,0 +1,147 @@
+# === Streaming MFCC ===
+# Computes MFCCs chunk by chunk, for live audio or songs too long to hold in memory.
+# The frames are the ones librosa.feature.mfcc gives for the whole signal with the same
+# parameters (hop = sr / labels_per_second, n_fft 2048, 128 mel bands, centered frames),
+# except for the dB floor below. The feature store's 'mfcc' recipe runs this extractor
+# over whole songs, so training features and live features are computed the same way.
+#
+# Frame i is centered on sample i * hop, so it is complete n_fft / 2 samples later;
+# the samples of the next frame that have arrived so far are kept between chunks.
+# flush() supplies the zero padding at the end of the signal, like center=True does.
+#
+# The one thing a stream cannot know is the top_db floor: librosa clips every band at
+# 80 dB below the loudest band of the whole song. Here the floor follows the loudest
+# band so far, starting from peak_db (PEAK_DB by default, in both the offline recipe
+# and live mode). With the song's peak as peak_db the frames match librosa's exactly;
+# otherwise frames before the loudest moment can differ in bands more than 80 dB below it.
+
+import numpy as np
+
+SAMPLE_RATE = 22050
+LABELS_PER_SECOND = 10
+HOP_LENGTH = SAMPLE_RATE // LABELS_PER_SECOND
+TOP_DB = 80.0  # Floor below the loudest mel band, librosa's default
+PEAK_DB = 40.0  # Starting guess of the loudest mel band in dB (about a full-scale tone)
+
+class StreamingMFCC:
+    def __init__(self, sr=SAMPLE_RATE, hop_length=HOP_LENGTH, n_mfcc=20, n_fft=2048, n_mels=128,
+                 top_db=TOP_DB, peak_db=PEAK_DB):
+        """
+        Args:
+            top_db (float): Floor below the loudest mel band in dB, None for no floor
+            peak_db (float): Starting estimate of the loudest mel band in dB, -np.inf to
+                follow the signal's own peak only
+        """
+        import librosa
+
+        self.hop_length = hop_length
+        self.n_fft = n_fft
+        self.top_db = top_db
+        self.initial_peak_db = peak_db
+
+        # Periodic Hann window, the mel filter bank and an orthonormal DCT-II, as librosa uses
+        self.window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float64)
+        k = np.arange(n_mfcc)[:, None]
+        n = np.arange(n_mels)[None, :]
+        self.dct = np.sqrt(2 / n_mels) * np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels))
+        self.dct[0] /= np.sqrt(2)
+
+        # Work buffers, reused for every frame
+        self.frame = np.zeros(n_fft)
+        self.windowed = np.zeros(n_fft)
+        self.power = np.zeros(n_fft // 2 + 1)
+        self.mel = np.zeros(n_mels)
+        self.mfcc = np.zeros(n_mfcc)
+        self.reset()
+
+    def reset(self):
+        """Start a new signal"""
+        # The first frame starts n_fft / 2 zeros before the signal (center=True)
+        self.frame[:] = 0.0
+        self.filled = self.n_fft // 2
+        self.skip = 0  # Samples between the end of one frame and the start of the next
+        self.peak_db = self.initial_peak_db
+
+    def process(self, chunk):
+        """
+        Feed the next samples of the signal.
+
+        Returns:
+            np.ndarray: (frames completed by this chunk, n_mfcc) float32, possibly empty
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        frames = []
+        pos = 0
+        while pos < len(chunk):
+            if self.skip:
+                taken = min(self.skip, len(chunk) - pos)
+                self.skip -= taken
+                pos += taken
+                continue
+
+            taken = min(self.n_fft - self.filled, len(chunk) - pos)
+            self.frame[self.filled:self.filled + taken] = chunk[pos:pos + taken]
+            self.filled += taken
+            pos += taken
+
+            if self.filled == self.n_fft:
+                frames.append(self.compute_frame().copy())
+                # Keep the overlap with the next frame, or skip the gap to it
+                if self.hop_length < self.n_fft:
+                    self.frame[:-self.hop_length] = self.frame[self.hop_length:]
+                    self.filled = self.n_fft - self.hop_length
+                else:
+                    self.filled = 0
+                    self.skip = self.hop_length - self.n_fft
+
+        if not frames:
+            return np.zeros((0, len(self.mfcc)), dtype=np.float32)
+        return np.asarray(frames, dtype=np.float32)
+
+    def flush(self):
+        """The remaining frames at the end of the signal; call reset() before reusing"""
+        return self.process(np.zeros(self.n_fft // 2, dtype=np.float32))
+
+    def compute_frame(self):
+        """MFCCs of the full frame buffer, in self.mfcc"""
+        np.multiply(self.frame, self.window, out=self.windowed)
+        np.abs(np.fft.rfft(self.windowed), out=self.power)
+        np.square(self.power, out=self.power)
+        np.dot(self.mel_basis, self.power, out=self.mel)
+
+        # power_to_db with ref 1.0, amin 1e-10
+        np.maximum(self.mel, 1e-10, out=self.mel)
+        np.log10(self.mel, out=self.mel)
+        self.mel *= 10.0
+        if self.top_db is not None:
+            self.peak_db = max(self.peak_db, self.mel.max())
+            np.maximum(self.mel, self.peak_db - self.top_db, out=self.mel)
+
+        np.dot(self.dct, self.mel, out=self.mfcc)
+        return self.mfcc
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import librosa
+
+    parser = argparse.ArgumentParser(description="Compare streamed MFCCs to librosa's offline MFCCs")
+    parser.add_argument("audio", help="Audio file")
+    parser.add_argument("--chunk", type=int, default=512, help="Samples per chunk")
+    args = parser.parse_args()
+
+    y, sr = librosa.load(args.audio, sr=SAMPLE_RATE)
+    mel = librosa.feature.melspectrogram(y=y, sr=sr, hop_length=HOP_LENGTH)
+    offline = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=20).T
+
+    # Given the song's peak, the streamed frames should equal the offline ones
+    extractor = StreamingMFCC(peak_db=librosa.power_to_db(mel.max()))
+    start = time.perf_counter()
+    frames = [extractor.process(y[i:i + args.chunk]) for i in range(0, len(y), args.chunk)]
+    streamed = np.concatenate(frames + [extractor.flush()])
+    elapsed = time.perf_counter() - start
+
+    error = np.abs(streamed - offline)
+    print(f"{len(streamed)} frames ({len(offline)} offline), {1000 * elapsed / len(streamed):.3f} ms per frame")
+    print(f"max abs error {error.max():.4f}, mean {error.mean():.5f}")
@@ -1,13 +1,20 @@
 # === Imports and Initialization ===
 
 import numpy as np  # For numerical operations and loading label arrays
+import os           # For reading the DMX backend choice from the environment
 import time         # For time delays and timing
 import random       # For randomness in pattern selection and movement
 import serial.tools.list_ports  # For detecting available serial ports (e.g., COM3)
 import serial
 from DMXClass import SimpleDMX  # Custom DMX control class for lighting via serial
+from dmx_backends import open_backend
 from threading import Thread, Lock, Event
 from pattern_functions import pattern_groups, reset_pattern_states
+from pattern_scheduler import PatternScheduler
+from show_compiler import compile_show, play_show, show_path, GLOBAL_CHANNELS
+from show_format import CompiledShow, write_show, song_hash
+from labeling.app.label_segments import LabelSegments
+from audio_clock import AudioClockPlayer, wait_for_song_time
 
 # Seed the random number generator with the current time to ensure variability
 random.seed(time.time())
@@ -19,8 +26,12 @@ pattern_state = {
     'speed': None
 }
 pattern_lock = Lock()
+pattern_changed = Event()  # Wakes the pattern thread as soon as a label changes
 stop_flag = Event()
 
+# Longest the pattern thread sleeps without checking for a label change (one DMX frame)
+MAX_TICK_WAIT = 1 / 40
+
 # === Check DMX Device ===
 
 def check_device():
@@ -50,14 +61,22 @@ def check_device():
     print("❌ COM3 not found.")
     return False
 
+# Where DMX frames go: "serial" (COM3), "loopback" (records frames in memory) or "null".
+# The last two run the full pipeline without hardware, e.g. DMX_BACKEND=loopback
+DMX_BACKEND = os.environ.get("DMX_BACKEND", "serial")
+
+# Only send DMX frames when they change (plus a 5fps keep-alive) instead of a constant 40fps,
+# e.g. DMX_CHANGE_DRIVEN=1
+DMX_CHANGE_DRIVEN = os.environ.get("DMX_CHANGE_DRIVEN", "0") == "1"
+
 # Exit the script if DMX device is not detected
-if not check_device():
+if DMX_BACKEND == "serial" and not check_device():
     exit()
 
 # === DMX Setup ===
 
-# Instantiate a new DMX controller object (assumes the SimpleDMX class manages serial output)
-dmx = SimpleDMX()
+# Instantiate a new DMX controller object (the backend decides where frames are sent)
+dmx = SimpleDMX(backend=open_backend(DMX_BACKEND), change_driven=DMX_CHANGE_DRIVEN)
 
 def setGlobalChannels():
     """
@@ -67,16 +86,13 @@ def setGlobalChannels():
     - Channel 2: Pattern group
     - Channel 3: Pattern size (brightness or intensity)
     """
-    dmx.set_channel(1, 23)
-    dmx.set_channel(2, 0)
-    dmx.set_channel(3, 255)
+    dmx.set_channels(1, GLOBAL_CHANNELS)
 
 def reset_dmx():
     """
     Resets all DMX channels (1–33) to 0, then reapplies global channel settings.
     """
-    for i in range(1, 34):
-        dmx.set_channel(i, 0)
+    dmx.clear()
     setGlobalChannels()
 
 # === Persistent Pattern Thread ===
@@ -85,45 +101,64 @@ def persistent_pattern_runner():
     """
     Persistent thread that continuously runs the current pattern.
     Reads from shared state and switches patterns when needed.
+    Pattern frames are timed by a PatternScheduler, so a label change is picked
+    up within one DMX frame instead of after the current pattern's sleep.
     """
+    scheduler = PatternScheduler(dmx)
     last_func = None
     last_speed = None
     
     while not stop_flag.is_set():
+        pattern_changed.clear()
         with pattern_lock:
             func = pattern_state['func']
             speed = pattern_state['speed']
         
         if func is None or speed is None:
-            time.sleep(0.05)  # Idle waiting
+            scheduler.clear()
+            last_func = None
+            last_speed = None
+            pattern_changed.wait(0.05)  # Idle waiting
             continue
         
+        # Stage the reset and the pattern steps so they go out as one DMX frame
+        dmx.begin_frame()
+        
         # Check if we need to switch patterns or speeds
         if func != last_func or speed != last_speed:
             print(f"Switching pattern to {func.__name__} at speed {speed}")
             reset_dmx()  # Clear old pattern state
             reset_pattern_states()  # Reset pattern function states
+            scheduler.set_pattern(func, speed)
             last_func = func
             last_speed = speed
         
-        # Execute one frame of the current pattern
+        # Execute every pattern frame that is due
         try:
-            func(dmx, speed)
+            scheduler.tick()
         except Exception as e:
             print(f"Error in pattern {func.__name__}: {e}")
             time.sleep(0.1)
+        finally:
+            dmx.commit()
+        
+        # Sleep until the next frame is due or the label changes
+        pattern_changed.wait(scheduler.time_until_due(MAX_TICK_WAIT))
 
 # === Load Label Data ===
 
-def load_mfcc_and_labels(audio_filename):
+def load_mfcc_and_labels(audio_filename, with_show=False):
     """
     Load MFCC features and labels from the compressed .npz file.
     
     Args:
         audio_filename (str): Name of the audio file (without extension)
+        with_show (bool): Also open the compiled show (<name>.show) next to the .npz
         
     Returns:
-        tuple: (mfcc_features, pattern_labels, speed_labels)
+        tuple: (mfcc_features, pattern_labels, speed_labels), plus the memory-mapped
+            CompiledShow when with_show is set (None if there is no show or it was
+            compiled from an older version of the label file)
     """
     from pathlib import Path
     
@@ -151,40 +186,57 @@ def load_mfcc_and_labels(audio_filename):
     assert len(pattern_labels) == len(speed_labels) == len(mfcc_features), \
         f"Mismatch in data lengths: MFCC={len(mfcc_features)}, patterns={len(pattern_labels)}, speeds={len(speed_labels)}"
     
-    return mfcc_features, pattern_labels, speed_labels
-
-# Load the audio data - adjust the filename as needed
-audio_filename = "one-three-nine"  # Without extension
-mfcc_features, pattern_labels, speed_labels = load_mfcc_and_labels(audio_filename)
-
-# === Main Loop ===
-
-print("Starting light playback...")
-
-# Initialize lights with default global settings
-setGlobalChannels()
-
-# Start the persistent pattern thread
-pattern_thread = Thread(target=persistent_pattern_runner, daemon=True)
-pattern_thread.start()
-
-# 3-second countdown before starting
-for i in range(3, 0, -1):
-    print(f"Starting in {i}...")
-    time.sleep(1)
+    if not with_show:
+        return mfcc_features, pattern_labels, speed_labels
+    
+    # The show is memory-mapped, so opening it does not read the frames
+    show = None
+    compiled_path = show_path(audio_filename, labels_dir)
+    if compiled_path.exists():
+        show = CompiledShow(compiled_path)
+        if show.song_hash != song_hash(npz_path):
+            print(f"Compiled show is out of date: {compiled_path}")
+            show = None
+        else:
+            print(f"Opened compiled show: {compiled_path} ({len(show)} frames, seed {show.seed})")
+    
+    return mfcc_features, pattern_labels, speed_labels, show
 
-# Track the currently running pattern/speed to avoid restarting identical ones
-current_pattern = None
-current_speed = None
-current_func = None
+# === Live Playback ===
 
-try:
-    for i in range(len(pattern_labels)):
-        start = time.time()  # measure execution time to maintain 10 FPS
-        
-        # Load the current pattern and speed labels
-        pattern = pattern_labels[i]
-        speed = speed_labels[i]
+def play_live_labels(pattern_labels, speed_labels, labels_per_second=10, clock=None, finished=None):
+    """
+    Hands the pattern to the persistent pattern thread whenever the pattern or speed
+    label changes. The labels are run-length encoded up front, so the loop sleeps
+    straight to the next change instead of visiting every 10 FPS frame.
+    
+    Args:
+        clock: Function returning the song position in seconds, e.g.
+            AudioClockPlayer.position. Defaults to time.perf_counter since the call.
+        finished (threading.Event): Optional, e.g. AudioClockPlayer.finished; playback
+            stops once it is set
+    
+    Returns:
+        list: Seconds each label change was applied after its song time
+    """
+    segments = LabelSegments(pattern_labels, speed_labels, labels_per_second=labels_per_second)
+    
+    if clock is None:
+        play_start = time.perf_counter()
+        clock = lambda: time.perf_counter() - play_start
+    
+    # Track the currently running pattern/speed to avoid restarting identical ones
+    current_pattern = None
+    current_speed = None
+    current_func = None
+    change_lags = []
+    
+    for i, end, pattern, speed in segments:
+        # Sleep until this segment starts on the song clock, so no drift builds up
+        segment_time = i / labels_per_second
+        wait_for_song_time(clock, segment_time, finished)
+        if finished is not None and finished.is_set():
+            break
 
         if pattern == 0 or speed == 0:
             # 0 means "turn off lights"
@@ -193,6 +245,7 @@ try:
                 with pattern_lock:
                     pattern_state['func'] = None
                     pattern_state['speed'] = None
+                pattern_changed.set()
                 current_pattern = None
                 current_speed = None
                 current_func = None
@@ -212,19 +265,108 @@ try:
                     with pattern_lock:
                         pattern_state['func'] = current_func
                         pattern_state['speed'] = speed
+                    pattern_changed.set()
                     print(f"[{i}] Pattern {pattern}, Speed {speed} → {current_func.__name__}")
+        
+        change_lags.append(clock() - segment_time)
+    
+    # Let the last segment play out
+    wait_for_song_time(clock, len(pattern_labels) / labels_per_second, finished)
+    return change_lags
+
+# Load the audio data - adjust the filename as needed
+audio_filename = "one-three-nine"  # Without extension
+
+# "live" picks and renders patterns while the song plays, "compiled" plays the show
+# pre-rendered by show_compiler (compiling and saving it first if needed)
+PLAYBACK_MODE = "live"
+SHOW_SEED = None  # None reuses any up-to-date compiled show, a number forces that seed
+
+# Play the song itself and drive the lights from the audio stream's clock
+AUDIO_SYNC = False
+AUDIO_DIR = "labeling/playlist_wavs"  # Where <audio_filename>.wav lives
+
+mfcc_features, pattern_labels, speed_labels, show = load_mfcc_and_labels(audio_filename, with_show=True)
+
+# === Main Loop ===
+
+print("Starting light playback...")
+
+# Initialize lights with default global settings
+setGlobalChannels()
 
-        # Ensure loop runs roughly at 10 frames per second
-        elapsed = time.time() - start
-        time.sleep(max(0, 0.1 - elapsed))
+if PLAYBACK_MODE == "compiled":
+    if show is None or (SHOW_SEED is not None and show.seed != SHOW_SEED):
+        seed = SHOW_SEED if SHOW_SEED is not None else int(time.time())
+        compile_start = time.time()
+        show_frames = compile_show(pattern_labels, speed_labels, seed=seed)
+        print(f"Compiled {len(show_frames)} DMX frames in {time.time() - compile_start:.2f}s (seed {seed})")
+        
+        compiled_path = show_path(audio_filename)
+        npz_path = compiled_path.with_name(f"{audio_filename}.mfcc_labels.npz")
+        write_show(compiled_path, show_frames, pattern_labels, speed_labels, song_hash(npz_path), seed=seed)
+        show = CompiledShow(compiled_path)
+else:
+    # Start the persistent pattern thread
+    pattern_thread = Thread(target=persistent_pattern_runner, daemon=True)
+    pattern_thread.start()
+
+player = None
+if AUDIO_SYNC:
+    import librosa
+    audio_path = f"{AUDIO_DIR}/{audio_filename}.wav"
+    y, sr = librosa.load(audio_path, sr=None)
+    player = AudioClockPlayer(y, sr)
+    print(f"Loaded audio: {audio_path} ({player.duration:.1f}s)")
+
+# 3-second countdown before starting
+for i in range(3, 0, -1):
+    print(f"Starting in {i}...")
+    time.sleep(1)
+
+song_clock = None
+song_finished = None
+if player is not None:
+    player.start()
+    song_clock = player.position
+    song_finished = player.finished
+    sync_start = (time.perf_counter(), player.position())
+
+try:
+    if PLAYBACK_MODE == "compiled":
+        play_show(dmx, show.frames, show.frame_rate, stop_flag=song_finished, clock=song_clock)
+    else:
+        change_lags = play_live_labels(pattern_labels, speed_labels, clock=song_clock, finished=song_finished)
+        if change_lags:
+            print(f"Label changes applied {1000 * np.mean(change_lags):.1f} ms after their song time on average "
+                  f"(max {1000 * np.max(change_lags):.1f} ms)")
 
 except KeyboardInterrupt:
     # Handle Ctrl+C gracefully
     print("Interrupted. Shutting down...")
+
+if player is not None:
+    # How far a sleep-paced loop would have drifted from the music over the same run
+    wall_elapsed = time.perf_counter() - sync_start[0]
+    audio_elapsed = player.position() - sync_start[1]
+    print(f"Audio clock vs. perf_counter drift: {1000 * (audio_elapsed - wall_elapsed):+.1f} ms "
+          f"over {wall_elapsed:.1f}s")
+    player.close()
     
 # Cleanup
 stop_flag.set()
-pattern_thread.join()
+pattern_changed.set()
+if PLAYBACK_MODE != "compiled":
+    pattern_thread.join()
+dmx.begin_frame()
 reset_dmx()
+dmx.commit()
+stats = dmx.get_stats()
+if DMX_CHANGE_DRIVEN:
+    print(f"DMX output: {stats['changes']} changed frames and {stats['keep_alives']} keep-alives, "
+          f"gaps {stats['min_gap_ms']:.1f}-{stats['max_gap_ms']:.1f} ms")
+else:
+    print(f"DMX output: {stats['achieved_fps']:.1f}/{stats['target_fps']} fps, "
+          f"jitter {stats['jitter_ms']:.2f} ms, {stats['overruns']} overruns in {stats['frames']} frames")
 dmx.close()
 print("Cleanup complete.")
\ No newline at end of file
@@ -0,0 +1,254 @@
+# === Live Lasers ===
+# Drives the lasers from live audio (microphone / line-in) instead of a labeled file:
+#
+#   capture -> features -> inference -> DMX output
+#
+# Each stage runs in its own thread and hands its results to the next through a
+# bounded queue. When a stage falls behind, the oldest item in its queue is dropped,
+# so latency stays bounded instead of building up. Every item carries the time its
+# audio was captured, and each stage's latency plus the end-to-end latency are
+# reported while running.
+#
+# The models are CausalTCN checkpoints from predicting/train.py --causal, one per task.
+
+import os
+import queue
+import random
+import time
+import threading
+import torch
+from DMXClass import SimpleDMX
+from dmx_backends import open_backend
+from pattern_functions import pattern_groups, reset_pattern_states
+from pattern_scheduler import PatternScheduler
+from show_compiler import GLOBAL_CHANNELS
+from labeling.streaming_mfcc import StreamingMFCC
+from predicting.TCN import CausalTCN, HIDDEN_CHANNELS, KERNEL_SIZE
+
+SAMPLE_RATE = 22050
+LABELS_PER_SECOND = 10
+HOP_LENGTH = SAMPLE_RATE // LABELS_PER_SECOND  # One feature frame per label
+N_MFCC = 20
+
+QUEUE_SIZE = 8  # Items per queue (0.8 s of frames) before the oldest are dropped
+HOLD_FRAMES = 3  # A predicted label must repeat this often before the pattern changes
+MAX_TICK_WAIT = 1 / 40  # Longest the output stage sleeps without checking for a label (one DMX frame)
+REPORT_SECONDS = 10
+
+MODEL_PATHS = {
+    'pattern': "predicting/pattern_causal_tcn.pt",
+    'speed': "predicting/speed_causal_tcn.pt",
+}
+
+# Where DMX frames go: "serial" (COM3), "loopback" or "null", e.g. DMX_BACKEND=loopback
+DMX_BACKEND = os.environ.get("DMX_BACKEND", "serial")
+
+stop_flag = threading.Event()
+
+# === Latency Stats ===
+
+class StageStats:
+    """Running latency statistics of one pipeline stage (Welford mean)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.max = 0.0
+        self.dropped = 0
+
+    def record(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.mean += (seconds - self.mean) / self.count
+            self.max = max(self.max, seconds)
+
+    def report(self):
+        with self.lock:
+            line = (f"{self.name:>10}: {self.count:5d} items, mean {1000 * self.mean:6.1f} ms, "
+                    f"max {1000 * self.max:6.1f} ms, dropped {self.dropped}")
+            self.reset()
+        return line
+
+def put_latest(q, item, stats):
+    """Put without blocking; if the queue is full, drop its oldest item"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+                stats.dropped += 1
+            except queue.Empty:
+                pass
+
+# === Pipeline Stages ===
+
+def open_capture(audio_queue, stats, device=None):
+    """
+    Capture stage: a sounddevice InputStream whose callback queues hop-sized mono
+    blocks with the time their newest sample was captured.
+    """
+    import sounddevice as sd
+
+    def callback(indata, frames, time_info, status):
+        now = time.perf_counter()
+        captured = now
+        if time_info.inputBufferAdcTime:
+            # When the last sample of the block was captured, on the perf_counter clock
+            captured -= stream.time - (time_info.inputBufferAdcTime + frames / SAMPLE_RATE)
+        stats.record(now - captured)
+        put_latest(audio_queue, (captured, now, indata[:, 0].copy()), stats)
+
+    stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype='float32',
+                            blocksize=HOP_LENGTH, device=device, callback=callback)
+    return stream
+
+def feature_stage(audio_queue, feature_queue, stats):
+    """
+    Features stage: MFCC frames from the streaming extractor, as soon as each is complete.
+    Its default dB floor (TOP_DB below the loudest band, starting from PEAK_DB) is the
+    one the feature store's 'mfcc' recipe uses, so these match the training features.
+    """
+    extractor = StreamingMFCC(sr=SAMPLE_RATE, hop_length=HOP_LENGTH, n_mfcc=N_MFCC)
+    while not stop_flag.is_set():
+        try:
+            captured, produced, block = audio_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        for mfcc in extractor.process(block):
+            now = time.perf_counter()
+            stats.record(now - produced)
+            put_latest(feature_queue, (captured, now, mfcc), stats)
+
+def load_model(path):
+    """A CausalTCN checkpoint, ready for streaming"""
+    checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+    if not checkpoint.get('causal'):
+        raise ValueError(f"{path} is not a causal model (train it with predicting/train.py --causal)")
+    model = CausalTCN(checkpoint['n_features'], checkpoint['n_classes'], HIDDEN_CHANNELS,
+                      KERNEL_SIZE, checkpoint['lookahead'])
+    model.load_state_dict(checkpoint['model'])
+    model.eval()
+    model.reset_stream()
+    mean = torch.as_tensor(checkpoint['mean'])
+    std = torch.as_tensor(checkpoint['std'])
+    return model, mean, std
+
+def inference_stage(models, feature_queue, label_queue, stats):
+    """Inference stage: step the pattern and speed models with every new frame"""
+    torch.set_num_threads(1)  # Leave the other cores to audio and DMX
+    while not stop_flag.is_set():
+        try:
+            captured, produced, mfcc = feature_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        frame = torch.from_numpy(mfcc).unsqueeze(0)
+        labels = {}
+        for task, (model, mean, std) in models.items():
+            labels[task] = int(model.step((frame - mean) / std).argmax(dim=1))
+        now = time.perf_counter()
+        stats.record(now - produced)
+        put_latest(label_queue, (captured, now, labels['pattern'], labels['speed']), stats)
+
+def output_stage(dmx, label_queue, stats, end_to_end):
+    """
+    DMX output stage: the persistent pattern runner, fed by predicted labels.
+    A label change takes effect once it has been predicted HOLD_FRAMES times in a row.
+    """
+    scheduler = PatternScheduler(dmx)
+    current = None  # (pattern, speed) playing
+    candidate, candidate_count = None, 0
+
+    while not stop_flag.is_set():
+        try:
+            captured, produced, pattern, speed = label_queue.get(timeout=scheduler.time_until_due(MAX_TICK_WAIT))
+        except queue.Empty:
+            captured = None
+
+        dmx.begin_frame()
+        try:
+            if captured is not None:
+                now = time.perf_counter()
+                stats.record(now - produced)
+
+                # Debounce single-frame flips in the predictions
+                if (pattern, speed) == candidate:
+                    candidate_count += 1
+                else:
+                    candidate, candidate_count = (pattern, speed), 1
+
+                if candidate_count >= HOLD_FRAMES and candidate != current:
+                    current = candidate
+                    group_funcs = pattern_groups.get(pattern)
+                    dmx.clear()
+                    dmx.set_channels(1, GLOBAL_CHANNELS)
+                    reset_pattern_states()
+                    scheduler.clear()
+                    if pattern != 0 and speed != 0 and group_funcs:
+                        func = random.choice(group_funcs)
+                        scheduler.set_pattern(func, speed)
+                        print(f"Pattern {pattern}, Speed {speed} → {func.__name__}")
+                    else:
+                        print(f"Pattern OFF ({pattern}, {speed})")
+                end_to_end.record(time.perf_counter() - captured)
+
+            scheduler.tick()
+        except Exception as e:
+            print(f"Error in output stage: {e}")
+        finally:
+            dmx.commit()
+
+# === Main ===
+
+if __name__ == "__main__":
+    models = {task: load_model(path) for task, path in MODEL_PATHS.items()}
+    print(f"Loaded models: {', '.join(f'{task} ({path})' for task, path in MODEL_PATHS.items())}")
+
+    dmx = SimpleDMX(backend=open_backend(DMX_BACKEND))
+    dmx.set_channels(1, GLOBAL_CHANNELS)
+
+    audio_queue = queue.Queue(QUEUE_SIZE)
+    feature_queue = queue.Queue(QUEUE_SIZE)
+    label_queue = queue.Queue(QUEUE_SIZE)
+    stats = {name: StageStats(name) for name in ("capture", "features", "inference", "output")}
+    end_to_end = StageStats("end-to-end")
+
+    threads = [
+        threading.Thread(target=feature_stage, args=(audio_queue, feature_queue, stats["features"]), daemon=True),
+        threading.Thread(target=inference_stage, args=(models, feature_queue, label_queue, stats["inference"]), daemon=True),
+        threading.Thread(target=output_stage, args=(dmx, label_queue, stats["output"], end_to_end), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    stream = open_capture(audio_queue, stats["capture"])
+    stream.start()
+    print("Listening... Ctrl+C to stop")
+
+    try:
+        while True:
+            time.sleep(REPORT_SECONDS)
+            print("Stage latency (time since the previous stage handed the item on):")
+            for stage in [*stats.values(), end_to_end]:
+                print("  " + stage.report())
+    except KeyboardInterrupt:
+        print("Interrupted. Shutting down...")
+
+    # Cleanup
+    stream.stop()
+    stream.close()
+    stop_flag.set()
+    for thread in threads:
+        thread.join()
+    dmx.begin_frame()
+    dmx.clear()
+    dmx.set_channels(1, GLOBAL_CHANNELS)
+    dmx.commit()
+    dmx.close()
+    print("Cleanup complete.")
@@ -1,11 +1,16 @@
 # === Pattern Functions ===
 # Each function renders a single frame and maintains its own state
-# Should be called repeatedly from the persistent pattern runner
+# Functions return immediately - how often a frame is rendered is declared in
+# pattern_intervals below and driven by the PatternScheduler (pattern_scheduler.py)
 
 import random
 import time
 import math
 
+# Time source for patterns that change behaviour over time (spotlight).
+# The show compiler swaps this for a virtual clock when rendering offline.
+clock = time.time
+
 # Global state for each pattern function
 dotLR_state = {'i': 33}
 dotRL_state = {'i': 96}
@@ -46,8 +51,6 @@ def dotLR(dmx, speed):
     # Wrap/reset when done
     if dotLR_state['i'] > 95:
         dotLR_state['i'] = 33
-    
-    time.sleep(1 / (50 * speed))
 
 def dotRL(dmx, speed):
     """Moves a dot from right to left, one step per call."""
@@ -58,8 +61,6 @@ def dotRL(dmx, speed):
     # Wrap/reset when done
     if dotRL_state['i'] < 33:
         dotRL_state['i'] = 96
-    
-    time.sleep(1 / (50 * speed))
 
 def sideToSideDot(dmx, speed):
     """Oscillates a dot back and forth, one step per call."""
@@ -77,8 +78,6 @@ def sideToSideDot(dmx, speed):
         if sideToSideDot_state['i'] > 95:
             sideToSideDot_state['direction'] = 'RL'
             sideToSideDot_state['i'] = 95
-    
-    time.sleep(1 / (50 * speed))
 
 def horizontalLineRL(dmx, speed):
     """Sweeps a horizontal line from right to left, one step per call."""
@@ -89,8 +88,6 @@ def horizontalLineRL(dmx, speed):
     # Wrap/reset when done
     if horizontalLineRL_state['i'] > 95:
         horizontalLineRL_state['i'] = 33
-    
-    time.sleep(1 / (50 * speed))
 
 def horizontalLineLR(dmx, speed):
     """Sweeps a horizontal line from left to right, one step per call."""
@@ -101,8 +98,6 @@ def horizontalLineLR(dmx, speed):
     # Wrap/reset when done
     if horizontalLineLR_state['i'] < 33:
         horizontalLineLR_state['i'] = 96
-    
-    time.sleep(1 / (50 * speed))
 
 def horizontalLineSideToSide(dmx, speed):
     """Oscillates a horizontal line back and forth, one step per call."""
@@ -120,8 +115,6 @@ def horizontalLineSideToSide(dmx, speed):
         if horizontalLineSideToSide_state['i'] < 33:
             horizontalLineSideToSide_state['direction'] = 'RL'
             horizontalLineSideToSide_state['i'] = 33
-    
-    time.sleep(1 / (50 * speed))
 
 def circleZoomIn(dmx, speed):
     """Zooms a circle pattern, one step per call."""
@@ -137,8 +130,6 @@ def circleZoomIn(dmx, speed):
     elif circleZoomIn_state['i'] <= 0:
         circleZoomIn_state['direction'] = 1
         circleZoomIn_state['i'] = 0
-    
-    time.sleep(1 / (100 * speed))
 
 def crazyDots(dmx, speed):
     """Flashes dots at random positions, one flash per call."""
@@ -149,8 +140,6 @@ def crazyDots(dmx, speed):
     crazyDots_state['count'] += 1
     if crazyDots_state['count'] > 20:
         crazyDots_state['count'] = 0
-    
-    time.sleep(1 / (1.5 * speed))
 
 def wiggleLine(dmx, speed):
     """Creates a waving line motion, one step per call."""
@@ -167,8 +156,6 @@ def wiggleLine(dmx, speed):
     elif wiggleLine_state['i'] <= 40:
         wiggleLine_state['direction'] = 1
         wiggleLine_state['i'] = 40
-    
-    time.sleep(1 / (50 * speed))
 
 def spazzCircle(dmx, speed):
     """Random circle positions, one frame per call."""
@@ -179,7 +166,6 @@ def spazzCircle(dmx, speed):
     
     dmx.set_channel(7, random.randint(0, 127))
     dmx.set_channel(8, random.randint(0, 127))
-    time.sleep(1 / (1.75 * speed))
 
 def spotlight(dmx, speed):
     """Bouncing spotlight with random direction changes, one frame per call."""
@@ -199,16 +185,16 @@ def spotlight(dmx, speed):
         angle = random.uniform(0, 2 * math.pi)
         state['dx'] = math.cos(angle)
         state['dy'] = math.sin(angle)
-        state['start_time'] = time.time()
+        state['start_time'] = clock()
         state['duration'] = random.uniform(3, 5)
         state['initialized'] = True
     
     # Check if we need a new direction
-    if time.time() - state['start_time'] > state['duration']:
+    if clock() - state['start_time'] > state['duration']:
         angle = random.uniform(0, 2 * math.pi)
         state['dx'] = math.cos(angle)
         state['dy'] = math.sin(angle)
-        state['start_time'] = time.time()
+        state['start_time'] = clock()
         state['duration'] = random.uniform(1, 3)
     
     # Update position
@@ -235,8 +221,6 @@ def spotlight(dmx, speed):
     # Send to DMX
     dmx.set_channel(7, int(state['x']))
     dmx.set_channel(8, int(state['y']))
-    
-    time.sleep(0.1 / speed)
 
 def driftingDot(dmx, speed):
     """Drifting dot with organic movement, one frame per call."""
@@ -287,8 +271,6 @@ def driftingDot(dmx, speed):
     # Send to DMX
     dmx.set_channel(7, int(state['x']))
     dmx.set_channel(8, int(state['y']))
-    
-    time.sleep(0.05)
 
 def stillBeam(dmx, speed):
     """Static beam at random position, sets once then holds."""
@@ -303,12 +285,10 @@ def stillBeam(dmx, speed):
     # Just maintain the position
     dmx.set_channel(7, stillBeam_state['x'])
     dmx.set_channel(8, stillBeam_state['y'])
-    time.sleep(0.1)
 
 def lineWithDotsRL_UD(dmx, speed):
     """Horizontal line with dots moving within it, going up and down. one frame per call."""
     state = lineWithDotsRL_state
-    speed = 1/10 * speed
     
     # Setup channels for line and dots
     dmx.set_channel(4, 45)   # vertical line
@@ -341,8 +321,6 @@ def lineWithDotsRL_UD(dmx, speed):
     dmx.set_channel(7, state['y'])   # vertical pan main line
     dmx.set_channel(24, state['y'])  # move line down/up together
     dmx.set_channel(25, state['x'])  # dots side to side inside the line
-    
-    time.sleep(0.02 / speed)
 
 def lineWithDotsRL_still(dmx, speed):
     """Horizontal line with dots moving within it, one frame per call."""
@@ -365,8 +343,6 @@ def lineWithDotsRL_still(dmx, speed):
         state['x'] = 0
     
     dmx.set_channel(25, state['x'])  # dots side to side inside the line
-    
-    time.sleep(0.15 / speed)
 
 def crazyDots2(dmx, speed):
     """Less random but funky movement using auto patterns."""
@@ -380,7 +356,6 @@ def crazyDots2(dmx, speed):
     
     dmx.set_channel(9, movementSpeed)
     dmx.set_channel(10, movementSpeed)
-    time.sleep(0.05)
 
 def twoCircleSpin(dmx, speed):
     """Two circles spinning pattern."""
@@ -399,7 +374,6 @@ def voiceWave(dmx, speed):
     
     movementSpeed = calculateSpeedForRange(128, 159, speed)
     dmx.set_channel(9, movementSpeed)
-    time.sleep(0.05)
 
 # Reset functions to initialize pattern states
 def reset_pattern_states():
@@ -408,7 +382,7 @@ def reset_pattern_states():
     global horizontalLineRL_state, horizontalLineLR_state, horizontalLineSideToSide_state
     global circleZoomIn_state, wiggleLine_state, crazyDots_state, crazyDots2_state
     global spazzCircle_state, spotlight_state, driftingDot_state, stillBeam_state
-    global lineWithDotsRL_UD_state, twoCircleSpin_state, voiceWave_state, lineWithDotsRL_still_state
+    global lineWithDotsRL_state, lineWithDotsRL_UD_state, twoCircleSpin_state, voiceWave_state, lineWithDotsRL_still_state
     
     dotLR_state = {'i': 33}
     dotRL_state = {'i': 96}
@@ -424,6 +398,7 @@ def reset_pattern_states():
     spotlight_state = {'x': 0, 'y': 0, 'dx': 0, 'dy': 0, 'start_time': 0, 'duration': 0, 'initialized': False}
     driftingDot_state = {'x': 0, 'y': 0, 'angle': 0, 'initialized': False}
     stillBeam_state = {'x': 0, 'y': 0, 'initialized': False}
+    lineWithDotsRL_state = {'y': 33, 'y_direction': 1, 'x': 0, 'x_direction': 1}
     lineWithDotsRL_UD_state = {'y': 33, 'y_direction': 1, 'x': 0, 'x_direction': 1}
     lineWithDotsRL_still_state = {'x': 0, 'x_direction': 1}
 
@@ -435,4 +410,30 @@ pattern_groups = {
     1: [stillBeam, dotLR, dotRL, sideToSideDot, horizontalLineRL, horizontalLineLR, horizontalLineSideToSide],  # Fill with desired functions
     2: [circleZoomIn, crazyDots, crazyDots2, lineWithDotsRL_UD, lineWithDotsRL_still, spazzCircle],  # Fill with desired functions  
     3: [wiggleLine, spotlight, driftingDot, voiceWave, twoCircleSpin],  # Fill with desired functions
-}
\ No newline at end of file
+}
+
+# Seconds between frames for each pattern, as a function of speed (1-10)
+pattern_intervals = {
+    dotLR: lambda speed: 1 / (50 * speed),
+    dotRL: lambda speed: 1 / (50 * speed),
+    sideToSideDot: lambda speed: 1 / (50 * speed),
+    horizontalLineRL: lambda speed: 1 / (50 * speed),
+    horizontalLineLR: lambda speed: 1 / (50 * speed),
+    horizontalLineSideToSide: lambda speed: 1 / (50 * speed),
+    circleZoomIn: lambda speed: 1 / (100 * speed),
+    crazyDots: lambda speed: 1 / (1.5 * speed),
+    wiggleLine: lambda speed: 1 / (50 * speed),
+    spazzCircle: lambda speed: 1 / (1.75 * speed),
+    spotlight: lambda speed: 0.1 / speed,
+    driftingDot: lambda speed: 0.05,
+    stillBeam: lambda speed: 0.1,
+    lineWithDotsRL_UD: lambda speed: 0.2 / speed,
+    lineWithDotsRL_still: lambda speed: 0.15 / speed,
+    crazyDots2: lambda speed: 0.05,
+    twoCircleSpin: lambda speed: 0.05,  # auto movement, only needs to hold the speed channel
+    voiceWave: lambda speed: 0.05,
+}
+
+def step_interval(func, speed):
+    """Seconds the scheduler should wait between frames of func at the given speed."""
+    return pattern_intervals[func](speed)
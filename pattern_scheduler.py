@@ -0,0 +1,87 @@
+# === Pattern Scheduler ===
+# Drives pattern functions from one high-resolution clock.
+# Patterns no longer sleep between frames; each one declares its step interval
+# (see pattern_intervals in pattern_functions.py) and the scheduler decides which
+# patterns are due on every tick. Several patterns can share one thread.
+
+import time
+from pattern_functions import step_interval
+
+class PatternScheduler:
+    def __init__(self, dmx, clock=time.perf_counter, max_catchup=8):
+        """
+        Args:
+            dmx: Object the pattern functions write to (normally SimpleDMX)
+            clock: Function returning the current time in seconds
+            max_catchup: Most steps a single pattern may take in one tick when it
+                fell behind. Anything older is dropped instead of replayed.
+        """
+        self.dmx = dmx
+        self.clock = clock
+        self.max_catchup = max_catchup
+        self.slots = {}  # slot name -> {'func', 'speed', 'interval', 'next_due'}
+
+    def set_pattern(self, func, speed, slot='main', now=None):
+        """
+        Put func at the given speed into a slot. The first frame is due immediately.
+        Re-setting the same func and speed keeps the running schedule.
+        """
+        current = self.slots.get(slot)
+        if current and current['func'] is func and current['speed'] == speed:
+            return
+
+        if now is None:
+            now = self.clock()
+        self.slots[slot] = {
+            'func': func,
+            'speed': speed,
+            'interval': step_interval(func, speed),
+            'next_due': now,
+        }
+
+    def clear(self, slot='main'):
+        """Stop stepping the pattern in a slot."""
+        self.slots.pop(slot, None)
+
+    def clear_all(self):
+        """Stop stepping every pattern."""
+        self.slots.clear()
+
+    def next_due(self):
+        """Time the next pattern step is due, or None if nothing is scheduled."""
+        if not self.slots:
+            return None
+        return min(slot['next_due'] for slot in self.slots.values())
+
+    def tick(self, now=None):
+        """
+        Step every pattern whose frame is due.
+
+        Returns:
+            int: Number of pattern steps executed
+        """
+        if now is None:
+            now = self.clock()
+
+        steps = 0
+        for slot in list(self.slots.values()):
+            taken = 0
+            while slot['next_due'] <= now and taken < self.max_catchup:
+                slot['func'](self.dmx, slot['speed'])
+                slot['next_due'] += slot['interval']
+                taken += 1
+
+            # Too far behind - drop the missed steps rather than bursting through them
+            if slot['next_due'] <= now:
+                slot['next_due'] = now + slot['interval']
+            steps += taken
+        return steps
+
+    def time_until_due(self, max_wait, now=None):
+        """Seconds until the next step is due, capped at max_wait."""
+        due = self.next_due()
+        if due is None:
+            return max_wait
+        if now is None:
+            now = self.clock()
+        return max(0.0, min(max_wait, due - now))
@@ -5,7 +5,8 @@ import time
 import serial.tools.list_ports
 import serial
 from DMXClass import SimpleDMX
-from pattern_functions import pattern_groups, reset_pattern_states
+from dmx_backends import LoopbackBackend
+from pattern_functions import pattern_groups, reset_pattern_states, step_interval
 import inspect
 
 class PatternTester:
@@ -39,7 +40,10 @@ class PatternTester:
     def setup_dmx(self):
         """Initialize DMX controller."""
         if not self.check_device():
-            print("DMX device not available. Running in simulation mode.")
+            # Patterns still render, frames are recorded in memory instead of sent
+            print("DMX device not available. Running in simulation mode (loopback backend).")
+            self.dmx = SimpleDMX(backend=LoopbackBackend())
+            self.set_global_channels()
             return False
             
         self.dmx = SimpleDMX()
@@ -49,16 +53,16 @@ class PatternTester:
     def set_global_channels(self):
         """Set global DMX channels."""
         if self.dmx:
-            self.dmx.set_channel(1, 23)  # On/Auto mode
-            self.dmx.set_channel(2, 0)   # Pattern group
-            self.dmx.set_channel(3, 255) # Pattern size/brightness
+            # On/Auto mode, pattern group, pattern size/brightness
+            self.dmx.set_channels(1, (23, 0, 255))
     
     def reset_dmx(self):
         """Reset all DMX channels to 0 and reapply globals."""
         if self.dmx:
-            for i in range(1, 34):
-                self.dmx.set_channel(i, 0)
+            self.dmx.begin_frame()
+            self.dmx.clear()
             self.set_global_channels()
+            self.dmx.commit()
     
     def get_all_patterns(self):
         """Get all available patterns organized by group."""
@@ -121,11 +125,12 @@ class PatternTester:
             return
             
         try:
-            if self.dmx:
+            # Without the device, setup_dmx() picked the loopback backend, so this always runs
+            self.dmx.begin_frame()
+            try:
                 self.current_pattern(self.dmx, self.current_speed)
-            else:
-                # Simulation mode - just print what would happen
-                print(f"[SIM] Executing {self.current_pattern.__name__} frame {self.frame_count} at speed {self.current_speed}")
+            finally:
+                self.dmx.commit()
             
             self.frame_count += 1
             if not autoFlag:
@@ -145,6 +150,8 @@ class PatternTester:
             while self.auto_mode and self.current_pattern:
                 try:
                     self.execute_frame(autoFlag=1)
+                    # Patterns return immediately, so wait out the pattern's own step interval
+                    time.sleep(step_interval(self.current_pattern, self.current_speed))
                 except Exception as e:
                     print(f"Error in auto mode: {e}")
         
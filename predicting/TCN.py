@@ -3,10 +3,14 @@ Bidirectional Temporal Convolutional Network (TCN) Demo
 --------------------------------------------------------
 This script builds a simple bidirectional TCN using centered (non-causal) convolutions.
 It learns to predict the next sine wave value given the previous ones.
+
+CausalTCN is the variant for live use: it only looks at past frames, and can be run
+one frame at a time with the dilated convolution history cached between steps.
 """
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 import numpy as np
 import matplotlib.pyplot as plt
@@ -78,6 +82,120 @@ class BiTCN(nn.Module):
         return self.fc(y[:, :, -1])
 
 
+# -----------------------------
+# ⏩ Causal TCN with Streaming Inference
+# -----------------------------
+class StreamingConv:
+    """
+    Runs a dilated Conv1d one frame at a time. A ring buffer holds the last
+    (kernel_size - 1) * dilation + 1 input frames, so each step is kernel_size
+    matrix-vector products instead of a convolution over the whole window.
+    """
+    def __init__(self, conv, batch_size=1):
+        self.conv = conv
+        self.kernel_size = conv.kernel_size[0]
+        self.dilation = conv.dilation[0]
+        self.span = (self.kernel_size - 1) * self.dilation + 1
+        weight = conv.weight.detach()
+        self.weight = weight.reshape(conv.out_channels, -1).t().contiguous()  # [C_in * K, C_out]
+        self.bias = conv.bias.detach() if conv.bias is not None else None
+        self.history = weight.new_zeros(batch_size, conv.in_channels, self.span)  # Zeros = causal padding
+        self.pos = 0
+        # Frame offsets of the kernel taps, oldest first
+        self.tap_offsets = torch.arange(self.kernel_size) * self.dilation - (self.span - 1)
+
+    def step(self, x):
+        """x: [B, C_in] newest frame -> [B, C_out]"""
+        self.pos = (self.pos + 1) % self.span
+        self.history[:, :, self.pos] = x
+        taps = self.history[:, :, (self.pos + self.tap_offsets) % self.span]  # [B, C_in, K]
+        out = taps.reshape(len(taps), -1) @ self.weight
+        if self.bias is not None:
+            out += self.bias
+        return out
+
+class CausalTCNBlock(nn.Module):
+    """
+    Residual block like BiTCNBlock, but padded on the left only, so the output at a
+    frame depends on that frame and earlier ones.
+    """
+    def __init__(self, in_channels, out_channels, kernel_size, dilation):
+        super().__init__()
+        self.padding = (kernel_size - 1) * dilation
+        self.conv1 = nn.Conv1d(in_channels, out_channels, kernel_size, dilation=dilation)
+        self.relu = nn.ReLU()
+        self.conv2 = nn.Conv1d(out_channels, out_channels, kernel_size, dilation=dilation)
+        self.downsample = nn.Conv1d(in_channels, out_channels, 1) if in_channels != out_channels else None
+        self.stream = None
+
+    def forward(self, x):
+        out = self.relu(self.conv1(F.pad(x, (self.padding, 0))))
+        out = self.conv2(F.pad(out, (self.padding, 0)))
+        if self.downsample:
+            x = self.downsample(x)
+        return self.relu(out + x)
+
+    def reset_stream(self, batch_size=1):
+        self.stream = (StreamingConv(self.conv1, batch_size), StreamingConv(self.conv2, batch_size))
+
+    def step(self, x):
+        """One frame: [B, C_in] -> [B, C_out], using the cached history"""
+        conv1, conv2 = self.stream
+        out = conv2.step(self.relu(conv1.step(x)))
+        residual = self.downsample(x.unsqueeze(-1)).squeeze(-1) if self.downsample else x
+        return self.relu(out + residual)
+
+class CausalTCN(nn.Module):
+    """
+    Causal counterpart of BiTCN. forward() takes a window like BiTCN and predicts from
+    its last frame; step() takes one new frame at a time for live prediction, costing
+    O(layers) per frame instead of re-running the whole receptive field.
+
+    lookahead gives the model a few frames of future context without making it
+    non-causal: the prediction made at frame t is for frame t - lookahead (train with
+    the target that many frames before the window end), i.e. a fixed delay.
+    """
+    def __init__(self, input_size, output_size, num_channels, kernel_size=3, lookahead=0):
+        super().__init__()
+        layers = []
+        for i, out_ch in enumerate(num_channels):
+            in_ch = input_size if i == 0 else num_channels[i - 1]
+            layers.append(CausalTCNBlock(in_ch, out_ch, kernel_size, 2 ** i))
+        self.network = nn.Sequential(*layers)
+        self.fc = nn.Linear(num_channels[-1], output_size)
+        self.lookahead = lookahead
+
+    @property
+    def receptive_field(self):
+        """Frames of history that affect one output"""
+        return 1 + sum(2 * block.padding for block in self.network)
+
+    def forward(self, x):
+        y = self.network(x)
+        return self.fc(y[:, :, -1])
+
+    def reset_stream(self, batch_size=1):
+        """Clear the cached history before streaming a new song"""
+        for block in self.network:
+            block.reset_stream(batch_size)
+
+    @torch.no_grad()
+    def step(self, frame):
+        """
+        Predict from one new frame.
+
+        Args:
+            frame (torch.Tensor): [B, input_size] features of the newest frame
+
+        Returns:
+            torch.Tensor: [B, output_size] prediction for frame t - lookahead
+        """
+        y = frame
+        for block in self.network:
+            y = block.step(y)
+        return self.fc(y)
+
+
 # -----------------------------
 # 🧩 Data: Predict Next Sine Value
 # -----------------------------
@@ -96,33 +214,34 @@ def generate_sine_batch(batch_size, seq_len):
     return x, y
 
 
-# -----------------------------
-# 🚀 Train the Model
-# -----------------------------
-model = BiTCN(input_size=1, output_size=1, num_channels=HIDDEN_CHANNELS, kernel_size=KERNEL_SIZE)
-optimizer = optim.Adam(model.parameters(), lr=LR)
-criterion = nn.MSELoss()
-
-for epoch in range(EPOCHS):
-    x, y = generate_sine_batch(BATCH_SIZE, SEQ_LEN)
-    optimizer.zero_grad()
-    y_pred = model(x)
-    loss = criterion(y_pred, y)
-    loss.backward()
-    optimizer.step()
-    if (epoch + 1) % 20 == 0:
-        print(f"Epoch {epoch+1}/{EPOCHS}, Loss={loss.item():.5f}")
-
-# -----------------------------
-# 📈 Test Visualization
-# -----------------------------
-x_test, y_test = generate_sine_batch(1, SEQ_LEN)
-with torch.no_grad():
-    y_pred = model(x_test).item()
-
-plt.plot(np.arange(SEQ_LEN), x_test.squeeze().numpy(), label="Input Sequence")
-plt.scatter(SEQ_LEN, y_test.item(), color='green', label="True Next Value")
-plt.scatter(SEQ_LEN, y_pred, color='red', label="Predicted Next Value")
-plt.legend()
-plt.title("Bidirectional TCN Sine Prediction Demo")
-plt.show()
+if __name__ == "__main__":
+    # -----------------------------
+    # 🚀 Train the Model
+    # -----------------------------
+    model = BiTCN(input_size=1, output_size=1, num_channels=HIDDEN_CHANNELS, kernel_size=KERNEL_SIZE)
+    optimizer = optim.Adam(model.parameters(), lr=LR)
+    criterion = nn.MSELoss()
+
+    for epoch in range(EPOCHS):
+        x, y = generate_sine_batch(BATCH_SIZE, SEQ_LEN)
+        optimizer.zero_grad()
+        y_pred = model(x)
+        loss = criterion(y_pred, y)
+        loss.backward()
+        optimizer.step()
+        if (epoch + 1) % 20 == 0:
+            print(f"Epoch {epoch+1}/{EPOCHS}, Loss={loss.item():.5f}")
+
+    # -----------------------------
+    # 📈 Test Visualization
+    # -----------------------------
+    x_test, y_test = generate_sine_batch(1, SEQ_LEN)
+    with torch.no_grad():
+        y_pred = model(x_test).item()
+
+    plt.plot(np.arange(SEQ_LEN), x_test.squeeze().numpy(), label="Input Sequence")
+    plt.scatter(SEQ_LEN, y_test.item(), color='green', label="True Next Value")
+    plt.scatter(SEQ_LEN, y_pred, color='red', label="Predicted Next Value")
+    plt.legend()
+    plt.title("Bidirectional TCN Sine Prediction Demo")
+    plt.show()
@@ -0,0 +1,208 @@
+"""
+Windowed Training Dataset
+-------------------------
+Turns every labeled song (labeling/labels/<song>.mfcc_labels.npz, written by
+labeling/extract_features.py) into one training corpus on disk:
+
+    corpus/features.npy  (total_frames, n_features) float32
+    corpus/labels.npy    (total_frames, 2) int16, columns pattern, speed
+    corpus/offsets.npy   (n_songs + 1,) int64, song i is frames offsets[i]:offsets[i+1]
+    corpus/songs.json    song names and per-feature mean/std of the whole corpus
+
+Everything is opened memory-mapped, so RAM use does not grow with the corpus.
+Training windows are views from np.lib.stride_tricks.sliding_window_view; only the
+windows of a batch are ever copied. Run from the repository root.
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from numpy.lib.stride_tricks import sliding_window_view
+
+LABEL_COLUMNS = ('pattern_labels', 'speed_labels')
+
+def build_corpus(labels_dir="labeling/labels", corpus_dir="predicting/corpus", feature="mfcc"):
+    """
+    Concatenate all labeled songs into the memory-mapped corpus, one song at a time.
+
+    Returns:
+        Path: The corpus directory
+    """
+    labels_dir, corpus_dir = Path(labels_dir), Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+
+    # First pass over the (small) label arrays only, to size the output
+    songs = []
+    for npz_path in sorted(labels_dir.glob("*.mfcc_labels.npz")):
+        with np.load(npz_path) as data:
+            if feature not in data.files or not all(key in data.files for key in LABEL_COLUMNS):
+                print(f"Skipping {npz_path.name}: no {feature} or labels")
+                continue
+            songs.append((npz_path, len(data['speed_labels'])))
+    if not songs:
+        raise FileNotFoundError(f"No labeled songs with {feature} in {labels_dir}")
+
+    offsets = np.zeros(len(songs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([n_frames for _, n_frames in songs])
+    with np.load(songs[0][0]) as data:
+        n_features = data[feature].shape[1]
+
+    features = np.lib.format.open_memmap(corpus_dir / "features.npy", mode='w+', dtype=np.float32,
+                                         shape=(int(offsets[-1]), n_features))
+    labels = np.lib.format.open_memmap(corpus_dir / "labels.npy", mode='w+', dtype=np.int16,
+                                       shape=(int(offsets[-1]), len(LABEL_COLUMNS)))
+
+    # Per-feature running sums for normalization
+    total = np.zeros(n_features, dtype=np.float64)
+    total_sq = np.zeros(n_features, dtype=np.float64)
+
+    for i, (npz_path, n_frames) in enumerate(songs):
+        start, end = offsets[i], offsets[i + 1]
+        with np.load(npz_path) as data:
+            values = data[feature][:n_frames]
+            features[start:end] = values
+            for column, key in enumerate(LABEL_COLUMNS):
+                labels[start:end, column] = data[key][:n_frames]
+        total += values.sum(axis=0, dtype=np.float64)
+        total_sq += np.square(values, dtype=np.float64).sum(axis=0)
+
+    features.flush()
+    labels.flush()
+    np.save(corpus_dir / "offsets.npy", offsets)
+
+    mean = total / offsets[-1]
+    std = np.sqrt(np.maximum(total_sq / offsets[-1] - mean ** 2, 1e-12))
+    with open(corpus_dir / "songs.json", "w") as f:
+        json.dump({'feature': feature, 'songs': [p.name for p, _ in songs],
+                   'mean': mean.tolist(), 'std': std.tolist()}, f, indent=2)
+
+    print(f"Built corpus of {len(songs)} songs, {offsets[-1]} frames -> {corpus_dir}")
+    return corpus_dir
+
+class WindowedCorpus:
+    """
+    Fixed-length training windows over the corpus. Windows never cross a song boundary.
+
+    window(i) is a (n_features, window) view, the [C, T] layout BiTCN takes; its
+    target is the labels at frame target_offset of the window (the last frame by
+    default, which is the step BiTCN predicts from).
+    """
+
+    def __init__(self, corpus_dir="predicting/corpus", window=30, stride=1, target_offset=None,
+                 songs=None, normalize=True, mean=None, std=None):
+        """
+        Args:
+            corpus_dir: Directory written by build_corpus
+            window (int): Frames per window
+            stride (int): Frames between consecutive window starts
+            target_offset (int): Frame in the window whose labels are the target
+            songs: Optional song indices to use (e.g. a train/validation split)
+            normalize (bool): Scale features to zero mean, unit variance per feature
+            mean, std (np.ndarray): Per-feature statistics to normalize with instead of the
+                whole-corpus ones in songs.json, e.g. song_stats() of the training songs
+        """
+        corpus_dir = Path(corpus_dir)
+        self.features = np.load(corpus_dir / "features.npy", mmap_mode='r')
+        self.labels = np.load(corpus_dir / "labels.npy", mmap_mode='r')
+        self.offsets = np.load(corpus_dir / "offsets.npy")
+        with open(corpus_dir / "songs.json") as f:
+            meta = json.load(f)
+        self.song_names = meta['songs']
+        self.mean = np.asarray(meta['mean'] if mean is None else mean, dtype=np.float32) if normalize else None
+        self.std = np.asarray(meta['std'] if std is None else std, dtype=np.float32) if normalize else None
+
+        self.window = window
+        self.target_offset = window - 1 if target_offset is None else target_offset
+
+        # (n_frames - window + 1, n_features, window) view, no copy
+        self.windows = sliding_window_view(self.features, window, axis=0)
+
+        # First frame of every valid window, song by song
+        songs = range(len(self.song_names)) if songs is None else songs
+        self.starts = np.concatenate([
+            np.arange(self.offsets[i], self.offsets[i + 1] - window + 1, stride, dtype=np.int64)
+            for i in songs
+        ] or [np.zeros(0, dtype=np.int64)])
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def n_features(self):
+        return self.features.shape[1]
+
+    def song_stats(self, songs):
+        """
+        Per-feature mean and std over the frames of the given songs, one song at a time.
+
+        Returns:
+            tuple: (mean, std) float32 arrays
+        """
+        total = np.zeros(self.n_features, dtype=np.float64)
+        total_sq = np.zeros(self.n_features, dtype=np.float64)
+        count = 0
+        for i in songs:
+            values = self.features[self.offsets[i]:self.offsets[i + 1]]
+            total += values.sum(axis=0, dtype=np.float64)
+            total_sq += np.square(values, dtype=np.float64).sum(axis=0)
+            count += len(values)
+        mean = total / max(count, 1)
+        std = np.sqrt(np.maximum(total_sq / max(count, 1) - mean ** 2, 1e-12))
+        return mean.astype(np.float32), std.astype(np.float32)
+
+    def window_view(self, i):
+        """Window i as a read-only (n_features, window) view into the memory map"""
+        return self.windows[self.starts[i]]
+
+    def target(self, i):
+        """(pattern, speed) labels of window i"""
+        return self.labels[self.starts[i] + self.target_offset]
+
+    def batch(self, indices, out_x=None, out_y=None):
+        """
+        Gather a batch of windows.
+
+        Args:
+            indices (np.ndarray): Window indices
+            out_x, out_y (np.ndarray): Optional preallocated (B, n_features, window) float32
+                and (B, 2) int64 arrays to fill instead of allocating
+
+        Returns:
+            tuple: (x, y) arrays
+        """
+        starts = self.starts[indices]
+        # Fancy indexing the window view gathers exactly the batch's windows
+        x = self.windows[starts]
+        if out_x is not None:
+            out_x[...] = x
+            x = out_x
+        if self.mean is not None:
+            x -= self.mean[:, None]
+            x /= self.std[:, None]
+        y = self.labels[starts + self.target_offset]
+        if out_y is not None:
+            out_y[...] = y
+            y = out_y
+        return x, y
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build the windowed training corpus from labeled songs")
+    parser.add_argument("--labels-dir", default="labeling/labels")
+    parser.add_argument("--corpus-dir", default="predicting/corpus")
+    parser.add_argument("--feature", default="mfcc")
+    parser.add_argument("--window", type=int, default=30)
+    args = parser.parse_args()
+
+    build_corpus(args.labels_dir, args.corpus_dir, args.feature)
+    corpus = WindowedCorpus(args.corpus_dir, window=args.window)
+
+    # Quick throughput check of batch assembly
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for _ in range(100):
+        corpus.batch(rng.integers(0, len(corpus), 64))
+    elapsed = time.perf_counter() - start
+    print(f"{len(corpus)} windows of {args.window} frames, {100 * 64 / elapsed:.0f} windows/s")
@@ -0,0 +1,217 @@
+"""
+BiTCN Training on the Labeled Corpus
+------------------------------------
+Trains a BiTCN (TCN.py) to predict the pattern or speed label from a window of
+MFCC frames, using the corpus built by dataset.py. With --causal it trains a
+CausalTCN instead, which can be streamed frame by frame for live prediction.
+
+Batches are assembled in DataLoader worker processes: every dataset item is a whole
+batch of window indices (BatchSampler + batch_size=None), copied from the memory-
+mapped corpus straight into one of a few reused batch tensors, so there is no
+per-sample collation or per-batch allocation. Workers prefetch ahead while the main
+process runs the model. Features are normalized with statistics of the training
+songs only. Run from the repository root.
+"""
+
+import argparse
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+from dataset import WindowedCorpus
+from TCN import BiTCN, CausalTCN, HIDDEN_CHANNELS, KERNEL_SIZE
+
+PREFETCH = 4  # Batches each worker prepares ahead
+
+# Label column in the corpus and number of classes per task
+TASKS = {
+    'pattern': (0, 9),  # Pattern groups 0-8
+    'speed': (1, 10),   # Speeds 0-9
+}
+
+class WindowBatches(Dataset):
+    """
+    Dataset whose items are whole batches: dataset[indices] returns (x, y) tensors of
+    shape (B, n_features, window) and (B,) for a list of window indices.
+
+    The corpus is opened lazily in each process, so workers memory-map it themselves
+    instead of receiving a pickled copy (spawn start method, e.g. on Windows).
+
+    Batches are written into a ring of n_buffers preallocated tensors per process. The
+    ring must be longer than the number of batches that can be in flight at once (the
+    ones a worker has queued plus the one being trained on, PREFETCH + 2), because a
+    buffer is refilled while older batches may still be read. Sent from a worker, the
+    buffers move to shared memory once and are then passed by handle, without copying.
+    """
+
+    def __init__(self, corpus_dir, window, label_column, songs=None, target_offset=None,
+                 mean=None, std=None, batch_size=256, n_buffers=PREFETCH + 2):
+        self.corpus_dir = corpus_dir
+        self.window = window
+        self.label_column = label_column
+        self.songs = songs
+        self.target_offset = target_offset
+        self.mean = mean
+        self.std = std
+        self.batch_size = batch_size
+        self.n_buffers = n_buffers
+        self._corpus = None
+        self._buffers = None
+        self._next_buffer = 0
+        self.length = len(self.corpus)
+
+    @property
+    def corpus(self):
+        if self._corpus is None:
+            self._corpus = WindowedCorpus(self.corpus_dir, window=self.window, songs=self.songs,
+                                          target_offset=self.target_offset, mean=self.mean, std=self.std)
+        return self._corpus
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_corpus'] = None
+        state['_buffers'] = None
+        return state
+
+    def next_buffers(self):
+        """The next (x, y) batch tensors of the ring, allocated on first use"""
+        if self._buffers is None:
+            corpus = self.corpus
+            self._buffers = [
+                (torch.empty((self.batch_size, corpus.n_features, self.window), dtype=torch.float32),
+                 torch.empty((self.batch_size, 2), dtype=torch.int64))
+                for _ in range(self.n_buffers)
+            ]
+        buffers = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % self.n_buffers
+        return buffers
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, indices):
+        x, y = self.next_buffers()
+        x, y = x[:len(indices)], y[:len(indices)]  # The last batch may be short
+        # Windows are written directly into the tensors' memory
+        self.corpus.batch(np.asarray(indices), out_x=x.numpy(), out_y=y.numpy())
+        return x, y[:, self.label_column]
+
+def make_loader(dataset, batch_size, shuffle, workers, prefetch=PREFETCH):
+    sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    return DataLoader(
+        dataset,
+        sampler=BatchSampler(sampler, batch_size, drop_last=shuffle),
+        batch_size=None,  # Items are already batches
+        num_workers=workers,
+        prefetch_factor=prefetch if workers else None,
+        persistent_workers=workers > 0,
+        pin_memory=torch.cuda.is_available(),
+    )
+
+def split_songs(corpus_dir, window, validation_share=0.1):
+    """Song indices for training and validation (every n-th song is held out)"""
+    n_songs = len(WindowedCorpus(corpus_dir, window=window).song_names)
+    step = max(2, round(1 / validation_share))
+    validation = list(range(step - 1, n_songs, step))
+    train = [i for i in range(n_songs) if i not in validation]
+    return train, validation
+
+def evaluate(model, loader, criterion, device):
+    model.eval()
+    total_loss, correct, count = 0.0, 0, 0
+    with torch.no_grad():
+        for x, y in loader:
+            x, y = x.to(device, non_blocking=True), y.to(device, non_blocking=True)
+            logits = model(x)
+            total_loss += criterion(logits, y).item() * len(y)
+            correct += (logits.argmax(dim=1) == y).sum().item()
+            count += len(y)
+    model.train()
+    return total_loss / max(count, 1), correct / max(count, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a BiTCN on the labeled corpus")
+    parser.add_argument("--task", choices=sorted(TASKS), default="speed")
+    parser.add_argument("--corpus-dir", default="predicting/corpus")
+    parser.add_argument("--window", type=int, default=30, help="Frames per input window (10 per second)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--causal", action="store_true", help="Train a CausalTCN for live streaming prediction")
+    parser.add_argument("--lookahead", type=int, default=0,
+                        help="CausalTCN only: frames of future context (predictions are delayed by this much)")
+    parser.add_argument("--workers", type=int, default=4, help="DataLoader worker processes")
+    parser.add_argument("--output", default=None,
+                        help="Checkpoint path (default predicting/<task>_bitcn.pt or <task>_causal_tcn.pt)")
+    args = parser.parse_args()
+
+    label_column, n_classes = TASKS[args.task]
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # A causal model with lookahead predicts the label lookahead frames before the window end
+    lookahead = args.lookahead if args.causal else 0
+    target_offset = args.window - 1 - lookahead
+
+    train_songs, validation_songs = split_songs(args.corpus_dir, args.window)
+    # Normalize with the training songs' statistics only, so nothing of the validation songs leaks in
+    mean, std = WindowedCorpus(args.corpus_dir, window=args.window).song_stats(train_songs)
+    train_set = WindowBatches(args.corpus_dir, args.window, label_column, train_songs, target_offset,
+                              mean, std, args.batch_size)
+    train_loader = make_loader(train_set, args.batch_size, shuffle=True, workers=args.workers)
+    validation_loader = None
+    if validation_songs:
+        validation_set = WindowBatches(args.corpus_dir, args.window, label_column, validation_songs, target_offset,
+                                       mean, std, args.batch_size)
+        validation_loader = make_loader(validation_set, args.batch_size, shuffle=False, workers=0)
+
+    if args.causal:
+        model = CausalTCN(input_size=train_set.corpus.n_features, output_size=n_classes,
+                          num_channels=HIDDEN_CHANNELS, kernel_size=KERNEL_SIZE, lookahead=lookahead).to(device)
+    else:
+        model = BiTCN(input_size=train_set.corpus.n_features, output_size=n_classes,
+                      num_channels=HIDDEN_CHANNELS, kernel_size=KERNEL_SIZE).to(device)
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
+    criterion = nn.CrossEntropyLoss()
+
+    print(f"Training {args.task}: {len(train_set)} windows from {len(train_songs)} songs, "
+          f"{args.workers} workers, device {device}")
+
+    for epoch in range(args.epochs):
+        epoch_start = time.perf_counter()
+        wait_time = 0.0  # Time spent waiting for the next batch
+        total_loss, batches = 0.0, 0
+
+        wait_start = time.perf_counter()
+        for x, y in train_loader:
+            wait_time += time.perf_counter() - wait_start
+            x, y = x.to(device, non_blocking=True), y.to(device, non_blocking=True)
+
+            optimizer.zero_grad()
+            loss = criterion(model(x), y)
+            loss.backward()
+            optimizer.step()
+
+            total_loss += loss.item()
+            batches += 1
+            wait_start = time.perf_counter()
+
+        elapsed = time.perf_counter() - epoch_start
+        message = (f"Epoch {epoch + 1}/{args.epochs}, Loss={total_loss / max(batches, 1):.4f}, "
+                   f"{batches * args.batch_size / elapsed:.0f} windows/s, "
+                   f"waiting on data {100 * wait_time / elapsed:.0f}%")
+        if validation_loader is not None:
+            validation_loss, accuracy = evaluate(model, validation_loader, criterion, device)
+            message += f", val Loss={validation_loss:.4f}, val acc={accuracy:.3f}"
+        print(message)
+
+    output = args.output or f"predicting/{args.task}_{'causal_tcn' if args.causal else 'bitcn'}.pt"
+    torch.save({'model': model.state_dict(), 'task': args.task, 'window': args.window,
+                'causal': args.causal, 'lookahead': lookahead,
+                'n_features': train_set.corpus.n_features, 'n_classes': n_classes,
+                'mean': mean, 'std': std}, output)
+    print(f"Saved {output}")
+
+if __name__ == "__main__":
+    main()
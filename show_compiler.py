@@ -0,0 +1,159 @@
+# === Offline Show Compiler ===
+# Renders a whole song's labels into DMX frames ahead of time.
+# The pattern functions are driven by the same PatternScheduler the live runner uses,
+# but on a virtual clock and with a fixed random seed, so the same labels and seed
+# always give the same show. Playback then only streams rows to SimpleDMX.
+
+import random
+import time
+import numpy as np
+from pathlib import Path
+import pattern_functions
+from pattern_functions import pattern_groups, reset_pattern_states
+from pattern_scheduler import PatternScheduler
+from dmx_backends import wait_until_ns
+from audio_clock import wait_for_song_time
+from show_format import write_show, song_hash
+
+NUM_CHANNELS = 33  # DMX channels 1-33, the start code is not stored
+GLOBAL_CHANNELS = bytes([23, 0, 255])  # Channels 1-3: On/Auto mode, pattern group, pattern size
+
+class VirtualDMX:
+    """The SimpleDMX write API on a plain in-memory universe, without any output"""
+
+    def __init__(self):
+        self.universe = bytearray(NUM_CHANNELS + 1)  # Index 0 is the start code
+
+    def begin_frame(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def set_channel(self, channel, value):
+        if 1 <= channel <= NUM_CHANNELS:
+            self.universe[channel] = max(0, min(255, value))
+
+    def set_channels(self, start, values):
+        for offset, value in enumerate(values):
+            self.set_channel(start + offset, value)
+
+    def clear(self):
+        self.universe[1:] = bytes(NUM_CHANNELS)
+
+def compile_show(pattern_labels, speed_labels, labels_per_second=10, frame_rate=40, seed=0):
+    """
+    Render labels into DMX frames, making the same decisions as the live playback loop
+    in lasersFromLabels.py (random pattern per group on each label change, pattern 0
+    or speed 0 stops the pattern and holds the last frame).
+
+    Args:
+        pattern_labels (np.ndarray): Pattern group per label frame
+        speed_labels (np.ndarray): Speed per label frame
+        labels_per_second (int): Label frame rate
+        frame_rate (int): DMX frame rate of the compiled show
+        seed (int): Random seed for pattern choice and the patterns themselves
+
+    Returns:
+        np.ndarray: (n_frames, NUM_CHANNELS) uint8 array, row f is channels 1-33 at
+            time f / frame_rate
+    """
+    n_labels = len(pattern_labels)
+    n_frames = n_labels * frame_rate // labels_per_second
+    frames = np.empty((n_frames, NUM_CHANNELS), dtype=np.uint8)
+
+    now = 0.0
+    dmx = VirtualDMX()
+    # No catch-up limit: fast patterns take several steps per DMX frame, as they do live
+    scheduler = PatternScheduler(dmx, clock=lambda: now, max_catchup=float("inf"))
+
+    real_clock = pattern_functions.clock
+    pattern_functions.clock = lambda: now
+    random.seed(seed)
+    reset_pattern_states()
+    try:
+        dmx.set_channels(1, GLOBAL_CHANNELS)
+        current = None  # (pattern, speed) currently playing
+
+        for f in range(n_frames):
+            now = f / frame_rate
+            i = f * labels_per_second // frame_rate
+            pattern = int(pattern_labels[i])
+            speed = int(speed_labels[i])
+
+            if pattern == 0 or speed == 0:
+                current = None
+                scheduler.clear()
+            elif (pattern, speed) != current:
+                current = (pattern, speed)
+                group_funcs = pattern_groups.get(pattern)
+                if group_funcs:
+                    func = random.choice(group_funcs)
+                    dmx.clear()
+                    dmx.set_channels(1, GLOBAL_CHANNELS)
+                    reset_pattern_states()
+                    scheduler.clear()
+                    scheduler.set_pattern(func, speed, now=now)
+                else:
+                    print(f"[{i}] Unknown pattern group: {pattern}")
+
+            scheduler.tick(now)
+            frames[f] = np.frombuffer(dmx.universe, dtype=np.uint8, offset=1)
+    finally:
+        pattern_functions.clock = real_clock
+        reset_pattern_states()
+
+    return frames
+
+def play_show(dmx, frames, frame_rate=40, stop_flag=None, start_time=0.0, clock=None):
+    """
+    Stream pre-rendered frames into a SimpleDMX, one row per 1/frame_rate seconds.
+
+    Args:
+        dmx (SimpleDMX): Output
+        frames (np.ndarray): (n_frames, channels) uint8 frames from compile_show,
+            or the memory-mapped CompiledShow.frames
+        frame_rate (int): Rate the frames were compiled at
+        stop_flag (threading.Event): Optional, stops playback early when set
+        start_time (float): Seconds into the show to start from
+        clock: Optional function returning the song position in seconds (e.g.
+            AudioClockPlayer.position) to pace frames by instead of perf_counter
+    """
+    period_ns = int(1e9 / frame_rate)
+    first = int(start_time * frame_rate)
+    start_ns = time.perf_counter_ns() - first * period_ns
+
+    for f in range(first, len(frames)):
+        if stop_flag is not None and stop_flag.is_set():
+            break
+        if clock is None:
+            wait_until_ns(start_ns + f * period_ns)
+        else:
+            wait_for_song_time(clock, f / frame_rate, finished=stop_flag)
+        dmx.set_frame(frames[f])
+
+def show_path(audio_filename, labels_dir="labeling/labels"):
+    """Where the compiled show for a song is stored, next to its label file"""
+    return Path(labels_dir) / f"{audio_filename}.show"
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-render a song's labels into a DMX frame array")
+    parser.add_argument("audio_filename", help="Song name without extension (labeling/labels/<name>.mfcc_labels.npz)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for pattern choices")
+    parser.add_argument("--frame-rate", type=int, default=40, help="DMX frames per second")
+    args = parser.parse_args()
+
+    npz_path = Path("labeling/labels") / f"{args.audio_filename}.mfcc_labels.npz"
+    data = np.load(npz_path)
+
+    start = time.perf_counter()
+    frames = compile_show(data['pattern_labels'], data['speed_labels'],
+                          frame_rate=args.frame_rate, seed=args.seed)
+    elapsed = time.perf_counter() - start
+
+    output_path = show_path(args.audio_filename)
+    write_show(output_path, frames, data['pattern_labels'], data['speed_labels'], song_hash(npz_path),
+               frame_rate=args.frame_rate, seed=args.seed)
+    print(f"Compiled {len(frames)} frames ({len(frames) / args.frame_rate:.1f}s) in {elapsed:.2f}s -> {output_path}")
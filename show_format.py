@@ -0,0 +1,135 @@
+# === Compiled Show File Format ===
+# Binary container for shows pre-rendered by show_compiler, laid out so that it can be
+# opened with np.memmap and nothing is read until it is used:
+#
+#   header   128 bytes, see HEADER_FORMAT
+#   segments n_segments records of SEGMENT_DTYPE, one per run of equal (pattern, speed)
+#   frames   n_frames x n_channels uint8, starting on a FRAME_ALIGN boundary
+#
+# Seeking to a time is a multiplication into the frame table; finding the segment
+# (pattern/speed) playing at a time is a binary search over the segment index.
+
+import hashlib
+import struct
+import numpy as np
+from pathlib import Path
+from labeling.app.label_segments import LabelSegments
+
+MAGIC = b'MLLSHOW\0'
+VERSION = 1
+# magic, version, frame_rate, labels_per_second, n_frames, n_channels, n_segments,
+# seed, song sha256, segment table offset, frame table offset
+HEADER_FORMAT = '<8sIIIQIIq32sQQ'
+HEADER_SIZE = 128
+FRAME_ALIGN = 4096
+
+SEGMENT_DTYPE = np.dtype([
+    ('start_frame', '<u8'),  # First DMX frame of the segment
+    ('end_frame', '<u8'),    # One past the last DMX frame
+    ('pattern', '<i4'),
+    ('speed', '<i4'),
+])
+
+def song_hash(path):
+    """SHA-256 of a file's contents (the label file a show was compiled from)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+def label_segments(pattern_labels, speed_labels, frame_rate=40, labels_per_second=10):
+    """
+    Runs of equal (pattern, speed) labels as a SEGMENT_DTYPE array in DMX frames.
+    Label i covers the DMX frames f with f * labels_per_second // frame_rate == i.
+    """
+    runs = LabelSegments(pattern_labels, speed_labels, labels_per_second=labels_per_second)
+
+    segments = np.empty(len(runs), dtype=SEGMENT_DTYPE)
+    segments['start_frame'] = -(-runs.starts * frame_rate // labels_per_second)
+    segments['end_frame'] = -(-runs.ends * frame_rate // labels_per_second)
+    segments['pattern'] = runs.values[:, 0]
+    segments['speed'] = runs.values[:, 1]
+    return segments
+
+def write_show(path, frames, pattern_labels, speed_labels, source_hash,
+               frame_rate=40, labels_per_second=10, seed=0):
+    """
+    Write a compiled show.
+
+    Args:
+        path: Output file (normally labeling/labels/<song>.show)
+        frames (np.ndarray): (n_frames, n_channels) uint8 frames from compile_show
+        pattern_labels, speed_labels (np.ndarray): Labels the show was compiled from
+        source_hash (bytes): song_hash() of the label file, used to spot stale shows
+        frame_rate (int): DMX frames per second of the show
+        labels_per_second (int): Label frame rate
+        seed (int): Seed the show was compiled with
+    """
+    frames = np.ascontiguousarray(frames, dtype=np.uint8)
+    if frames.ndim != 2 or frames.shape[0] == 0:
+        raise ValueError(f"A show needs at least one frame, got frames of shape {frames.shape}")
+    segments = label_segments(pattern_labels, speed_labels, frame_rate, labels_per_second)
+
+    segment_offset = HEADER_SIZE
+    frame_offset = -(-(segment_offset + segments.nbytes) // FRAME_ALIGN) * FRAME_ALIGN
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, frame_rate, labels_per_second,
+                         frames.shape[0], frames.shape[1], len(segments), seed,
+                         source_hash, segment_offset, frame_offset)
+
+    # Write to a temp file and rename, so a player never opens a half-written show
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+        f.write(segments.tobytes())
+        f.write(b'\0' * (frame_offset - segment_offset - segments.nbytes))
+        f.write(frames.tobytes())
+    tmp_path.replace(path)
+
+class CompiledShow:
+    """Read-only, memory-mapped view of a compiled show file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+            raise ValueError(f"Not a compiled show file: {self.path}")
+
+        (_, version, self.frame_rate, self.labels_per_second, n_frames, n_channels,
+         n_segments, self.seed, self.song_hash, segment_offset, frame_offset) = \
+            struct.unpack_from(HEADER_FORMAT, header)
+        if version != VERSION:
+            raise ValueError(f"Unsupported show file version {version}: {self.path}")
+        if n_frames == 0 or n_segments == 0:
+            # frame_index/segment_at would wrap around to index -1
+            raise ValueError(f"Compiled show has no frames: {self.path}")
+
+        self.segments = np.memmap(self.path, dtype=SEGMENT_DTYPE, mode='r',
+                                  offset=segment_offset, shape=(n_segments,))
+        self.frames = np.memmap(self.path, dtype=np.uint8, mode='r',
+                                offset=frame_offset, shape=(n_frames, n_channels))
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def duration(self):
+        """Show length in seconds"""
+        return len(self.frames) / self.frame_rate
+
+    def frame_index(self, time_pos):
+        """Index of the frame playing at time_pos seconds (clamped to the show)"""
+        return min(max(int(time_pos * self.frame_rate), 0), len(self.frames) - 1)
+
+    def frame_at(self, time_pos):
+        """The uint8 channel row playing at time_pos seconds"""
+        return self.frames[self.frame_index(time_pos)]
+
+    def segment_at(self, time_pos):
+        """(start_frame, end_frame, pattern, speed) of the segment playing at time_pos"""
+        index = np.searchsorted(self.segments['start_frame'], self.frame_index(time_pos), side='right') - 1
+        segment = self.segments[index]
+        return (int(segment['start_frame']), int(segment['end_frame']),
+                int(segment['pattern']), int(segment['speed']))
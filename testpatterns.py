@@ -7,8 +7,10 @@ and are reduced to frame-by-frame implementation with global states.
 import time
 import random
 random.seed(time.time())
+import os
 import serial.tools.list_ports
 from DMXClass import SimpleDMX
+from dmx_backends import open_backend
 import math
 
 def check_device():
@@ -45,11 +47,14 @@ def check_device():
         print("Make sure QLC+ or other software isn't using the device")
         return False
     
-if not check_device():
+# "serial" (COM3), "loopback" or "null" - the last two need no hardware
+DMX_BACKEND = os.environ.get("DMX_BACKEND", "serial")
+
+if DMX_BACKEND == "serial" and not check_device():
     print("Cannot proceed - device check failed")
     exit()
 
-dmx = SimpleDMX()
+dmx = SimpleDMX(backend=open_backend(DMX_BACKEND))
 
 def circleZoomIn(speed):
     dmx.set_channel(4, 5) # Circle